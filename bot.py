@@ -72,6 +72,10 @@ async def on_ready():
         await bot.change_presence(activity=activity)
         print("Set bot activity.")
 
+        # Own the issue/PR GitHub session in a cog so it is closed when the bot shuts down
+        if bot.get_cog('IssuePRSession') is None:
+            await bot.add_cog(issue_pr_commands.IssuePRSession(bot))
+
         # Load M4M as a cog
         await bot.load_extension('commands.m4m_task_mentor_agent')
         await bot.load_extension('commands.m4m_task_assignee_finder')
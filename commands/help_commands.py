@@ -2,7 +2,31 @@ import discord
 import requests
 import aiohttp
 import time
-from config import GRAPHQL_URL, HEADERS, GITHUB_ORG_NAME, PROJECTS_PER_PAGE
+import math
+import cachetools
+from operator import attrgetter
+from typing import NamedTuple
+from config import (
+    GRAPHQL_URL,
+    HEADERS,
+    GITHUB_ORG_NAME,
+    PROJECTS_PER_PAGE,
+    PROJECTS_CACHE_DURATION,
+    EMBED_SIZE_LIMIT,
+    MAX_EMBED_FIELDS,
+    MAX_EMBEDS_PER_MESSAGE,
+    MESSAGE_EMBED_CHAR_LIMIT,
+)
+
+# Rendered /projects embeds (grouped per message), reused until it expires so warm calls skip GitHub and the defer round-trip
+projects_embed_cache = cachetools.TTLCache(maxsize=1, ttl=PROJECTS_CACHE_DURATION)
+
+
+class Project(NamedTuple):
+    """The fields of a GitHub ProjectV2 node used by /projects."""
+    number: int
+    title: str
+    url: str
 
 
 def setup(bot):
@@ -116,8 +140,15 @@ async def help_command(interaction: discord.Interaction):
 @discord.app_commands.command(name="projects", description=f"Lists all projects in the {GITHUB_ORG_NAME} organization with their numbers.")
 async def projects_command(interaction: discord.Interaction):
     """Displays a list of all projects in the organization."""
+    cached_batches = projects_embed_cache.get('projects')
+    if cached_batches is not None:
+        await interaction.response.send_message(embeds=cached_batches[0], ephemeral=True)
+        for batch in cached_batches[1:]:
+            await interaction.followup.send(embeds=batch, ephemeral=True)
+        return
+
     await interaction.response.defer(ephemeral=True)
-    
+
     accumulated_projects = []
     current_cursor = None
     has_next_page = True
@@ -126,17 +157,15 @@ async def projects_command(interaction: discord.Interaction):
     graphql_query_template = """
     query GetOrgProjects($login: String!, $projectsPerPage: Int!, $cursor: String) {
       organization(login: $login) {
-        projectsV2(first: $projectsPerPage, after: $cursor, orderBy: {field: CREATED_AT, direction: DESC}) {
+        projectsV2(first: $projectsPerPage, after: $cursor, query: "is:open", orderBy: {field: CREATED_AT, direction: DESC}) {
           pageInfo {
             endCursor
             hasNextPage
           }
           nodes {
-            id
             title
             number
             url
-            closed
           }
         }
       }
@@ -181,10 +210,12 @@ async def projects_command(interaction: discord.Interaction):
 
         projects_data = organization_data.get("projectsV2", {})
         page_projects = projects_data.get("nodes", [])
-        
-        # Filter out closed projects and add to accumulated list
-        active_projects = [p for p in page_projects if p and not p.get("closed", False)]
-        accumulated_projects.extend(active_projects)
+
+        # Closed projects are already filtered out server-side by the "is:open" query
+        accumulated_projects.extend(
+            Project(p.get("number") or 0, p.get("title") or "Untitled", p.get("url") or "")
+            for p in page_projects if p
+        )
 
         page_info = projects_data.get("pageInfo", {})
         has_next_page = page_info.get("hasNextPage", False)
@@ -198,7 +229,7 @@ async def projects_command(interaction: discord.Interaction):
         return
 
     # Sort projects by number
-    accumulated_projects.sort(key=lambda p: p.get("number", 0))
+    accumulated_projects.sort(key=attrgetter("number"))
 
     # Create embed
     embed = discord.Embed(
@@ -206,19 +237,16 @@ async def projects_command(interaction: discord.Interaction):
         description=f"Here are all the active projects in the {GITHUB_ORG_NAME} organization ({len(accumulated_projects)} total):",
         color=discord.Color.green()
     )
+    embeds = [embed]
 
     # Group projects for better display (Discord embed has field limits)
     project_lines = []
     for project in accumulated_projects:
-        number = project.get("number", "?")
-        title = project.get("title", "Untitled")
-        url = project.get("url", "")
-        
-        if url:
-            project_line = f"**#{number}** - [{title}]({url})"
+        if project.url:
+            project_line = f"**#{project.number}** - [{project.title}]({project.url})"
         else:
-            project_line = f"**#{number}** - {title}"
-        
+            project_line = f"**#{project.number}** - {project.title}"
+
         project_lines.append(project_line)
 
     # Split projects into chunks to fit in embed fields (Discord has a 1024 char limit per field)
@@ -227,16 +255,46 @@ async def projects_command(interaction: discord.Interaction):
         chunk = project_lines[i:i + chunk_size]
         field_name = f"Projects {i+1}-{min(i+chunk_size, len(project_lines))}" if len(project_lines) > chunk_size else "Projects"
         field_value = "\n".join(chunk)
+
+        # Seal the current embed before it hits Discord's per-embed limits and continue in a new one
+        if len(embed.fields) >= MAX_EMBED_FIELDS or len(embed) + len(field_name) + len(field_value) > EMBED_SIZE_LIMIT:
+            embed = discord.Embed(title=f"{GITHUB_ORG_NAME} Projects (cont.)", color=discord.Color.green())
+            embeds.append(embed)
         embed.add_field(name=field_name, value=field_value, inline=False)
 
-    embed.add_field(
-        name="💡 Usage Tip",
-        value="Use the project number with `/project_tasks number:<number>` to view tasks for any specific project!",
-        inline=False
-    )
+    tip_name = "💡 Usage Tip"
+    tip_value = "Use the project number with `/project_tasks number:<number>` to view tasks for any specific project!"
+    footer_text = "Mantis AI Cognitive Cartography"
+    # The tip and footer go on the last embed, so they need the same limit check as the project fields
+    if len(embed.fields) >= MAX_EMBED_FIELDS or len(embed) + len(tip_name) + len(tip_value) + len(footer_text) > EMBED_SIZE_LIMIT:
+        embed = discord.Embed(title=f"{GITHUB_ORG_NAME} Projects (cont.)", color=discord.Color.green())
+        embeds.append(embed)
+    embed.add_field(name=tip_name, value=tip_value, inline=False)
+
+    embed.set_footer(text=footer_text)
+
+    message_batches = batch_embeds_for_messages(embeds)
+    projects_embed_cache['projects'] = message_batches
+    for batch in message_batches:
+        await interaction.followup.send(embeds=batch, ephemeral=True)
 
-    embed.set_footer(text="Mantis AI Cognitive Cartography")
-    await interaction.followup.send(embed=embed, ephemeral=True)
+
+def batch_embeds_for_messages(embeds):
+    """Group embeds into as few messages as Discord allows (10 embeds / 6000 chars combined per message)."""
+    batches = []
+    current_batch = []
+    current_size = 0
+    for embed in embeds:
+        embed_size = len(embed)
+        if current_batch and (len(current_batch) >= MAX_EMBEDS_PER_MESSAGE or current_size + embed_size > MESSAGE_EMBED_CHAR_LIMIT):
+            batches.append(current_batch)
+            current_batch = []
+            current_size = 0
+        current_batch.append(embed)
+        current_size += embed_size
+    if current_batch:
+        batches.append(current_batch)
+    return batches
 
 
 @discord.app_commands.command(name="network-test", description="Test network connectivity to Discord and GitHub APIs.")
@@ -322,20 +380,26 @@ async def network_test(interaction: discord.Interaction):
         results.append(f"❌ DNS Resolution: {str(e)[:50]}")
     
     # Test 6: WebSocket Connection Test
-    try:
-        gateway_url = "wss://gateway.discord.gg/?v=10&encoding=json"
-        start_time = time.time()
-        async with aiohttp.ClientSession() as session:
-            async with session.ws_connect(gateway_url) as ws:
-                ws_time = round((time.time() - start_time) * 1000, 2)
-                results.append(f"✅ WebSocket Connection: {ws_time}ms")
-                await ws.close()
-    except Exception as e:
-        results.append(f"❌ WebSocket Connection: {str(e)[:50]}")
+    # Reuse the live gateway heartbeat latency; only open a new gateway connection
+    # when the bot's own connection is down (latency is nan/inf).
+    heartbeat_latency = interaction.client.latency
+    if math.isfinite(heartbeat_latency):
+        results.append(f"✅ WebSocket Connection: {round(heartbeat_latency * 1000, 2)}ms (heartbeat)")
+    else:
+        try:
+            gateway_url = "wss://gateway.discord.gg/?v=10&encoding=json"
+            start_time = time.time()
+            async with aiohttp.ClientSession() as session:
+                async with session.ws_connect(gateway_url) as ws:
+                    ws_time = round((time.time() - start_time) * 1000, 2)
+                    results.append(f"⚠️ WebSocket Connection: {ws_time}ms (heartbeat unavailable, new handshake)")
+                    await ws.close()
+        except Exception as e:
+            results.append(f"❌ WebSocket Connection: {str(e)[:50]}")
     
     # Add bot status info
     results.append("\n**Bot Status:**")
-    results.append(f"Latency: {round(interaction.client.latency * 1000, 2)}ms")
+    results.append(f"Latency: {round(heartbeat_latency * 1000, 2)}ms")
     results.append(f"Guilds: {len(interaction.client.guilds)}")
     results.append(f"Users: {len(interaction.client.users)}")
     
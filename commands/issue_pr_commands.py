@@ -1,6 +1,15 @@
 import discord
-import requests
+from discord.ext import commands
+import aiohttp
+import asyncio
+import cachetools
+import heapq
+import io
+import orjson
+import re
 import typing
+from collections import defaultdict
+from functools import lru_cache
 from config import (
     GRAPHQL_URL, 
     HEADERS, 
@@ -8,155 +17,379 @@ from config import (
     ITEMS_PER_PAGE,
     MAX_ITEMS_TO_DISPLAY,
     DISCORD_FIELD_CHAR_LIMIT,
+    EMBED_SIZE_LIMIT,
+    ISSUE_PR_CACHE_DURATION,
+    GITHUB_HTTP_TIMEOUT,
 )
 
 
-def estimate_embed_size(embed):
-    """Estimate the total size of a Discord embed to prevent exceeding limits."""
-    size = 0
-    if embed.title:
-        size += len(embed.title)
-    if embed.description:
-        size += len(embed.description)
-    if embed.footer and embed.footer.text:
-        size += len(embed.footer.text)
-    
-    for field in embed.fields:
-        if field.name:
-            size += len(field.name)
-        if field.value:
-            size += len(field.value)
-    
-    return size
+def add_fields_within_size_limit(embed, fields, footer_text):
+    """Add (name, value) fields and the footer to an embed, stopping before Discord's size limit is exceeded.
 
+    A running total is kept as fields are added, so the embed is never re-measured.
+    """
+    total_size = len(embed.title or "") + len(embed.description or "") + len(footer_text)
+    truncated = False
+
+    for name, value in fields:
+        field_size = len(name) + len(value)
+        if embed.fields and total_size + field_size > EMBED_SIZE_LIMIT:
+            truncated = True
+            break
+        embed.add_field(name=name, value=value, inline=False)
+        total_size += field_size
+
+    if truncated:
+        embed.add_field(
+            name="⚠️ Content Truncated",
+            value="Some items were hidden due to Discord's size limits. Try filtering by a specific repository.",
+            inline=False
+        )
 
-def setup(bot):
-    """Register issue and PR commands with the bot."""
-    bot.tree.add_command(issues)
-    bot.tree.add_command(prs)
+    embed.set_footer(text=footer_text)
 
 
-@discord.app_commands.command(
-    name="issues",
-    description=f"View open issues in {GITHUB_ORG_NAME} repositories (Mantis and MantisAPI).",
-)
-@discord.app_commands.describe(
-    repository="Filter by specific repository (default: both).",
-)
-@discord.app_commands.choices(repository=[
-    discord.app_commands.Choice(name="Mantis", value="Mantis"),
-    discord.app_commands.Choice(name="MantisAPI", value="MantisAPI"),
-    discord.app_commands.Choice(name="Both", value="Both"),
-])
-async def issues(
-    interaction: discord.Interaction,
-    repository: typing.Optional[discord.app_commands.Choice[str]] = None,
-):
-    """Fetches open issues from KellisLab repositories and displays them."""
-    await interaction.response.defer()
+class GitHubFetchError(Exception):
+    """Raised when fetching from the GitHub GraphQL API fails. The message is shown to the user."""
 
-    # Determine which repositories to query
-    repos_to_query = []
-    if repository is None or repository.value == "Both":
-        repos_to_query = ["Mantis", "MantisAPI"]
-        repo_display = "Both repositories"
-    else:
-        repos_to_query = [repository.value]
-        repo_display = repository.value
 
-    all_issues = []
+# Recent GraphQL responses keyed by (query, variables), so repeated /issues and /prs calls skip the network
+graphql_response_cache = cachetools.TTLCache(maxsize=64, ttl=ISSUE_PR_CACHE_DURATION)
+
+# Ask GitHub for compressed responses; aiohttp can only decode brotli when the Brotli package is installed
+try:
+    import brotli  # noqa: F401
+    GITHUB_ACCEPT_ENCODING = "gzip, br"
+except ImportError:
+    GITHUB_ACCEPT_ENCODING = "gzip"
+
+# Shared aiohttp session, reused across invocations so connections to GitHub stay pooled
+http_session: typing.Optional[aiohttp.ClientSession] = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Return the shared aiohttp session, creating it on first use inside the running event loop.
+
+    The session carries the GitHub headers and keeps a small pool of keep-alive connections,
+    so repeated commands skip DNS, TCP and TLS setup.
+    """
+    global http_session
+    if http_session is None or http_session.closed:
+        http_session = aiohttp.ClientSession(
+            headers={**HEADERS, "Accept-Encoding": GITHUB_ACCEPT_ENCODING},
+            timeout=aiohttp.ClientTimeout(total=GITHUB_HTTP_TIMEOUT),
+            connector=aiohttp.TCPConnector(limit_per_host=8, keepalive_timeout=60),
+        )
+    return http_session
+
+
+async def close_http_session():
+    """Close the shared aiohttp session if it was opened."""
+    global http_session
+    if http_session is not None and not http_session.closed:
+        await http_session.close()
+    http_session = None
+
 
-    # GraphQL query template for issues
-    graphql_query_template = """
-    query GetRepoIssues($owner: String!, $name: String!, $first: Int!, $cursor: String) {
-      repository(owner: $owner, name: $name) {
-        issues(first: $first, after: $cursor, states: OPEN, orderBy: {field: CREATED_AT, direction: DESC}) {
-          pageInfo {
+def repo_alias(repo_name: str) -> str:
+    """Turn a repository name into a valid GraphQL alias / variable suffix (e.g. "Mantis-Discord-Bot" -> "mantis_discord_bot")."""
+    return re.sub(r"\W", "_", repo_name).lower()
+
+
+@lru_cache(maxsize=32)
+def build_issues_query(repo_names: tuple) -> str:
+    """Build one GraphQL document that fetches a page of open issues for every repository via aliases.
+
+    Cached per repo set, so pages and repeat invocations reuse the same query string.
+    """
+    page_vars = "".join(f", $first_{repo_alias(name)}: Int!, $cursor_{repo_alias(name)}: String" for name in repo_names)
+    repo_selections = "".join(
+        f"""
+      {repo_alias(name)}: repository(owner: $owner, name: "{name}") {{
+        issues(first: $first_{repo_alias(name)}, after: $cursor_{repo_alias(name)}, states: OPEN, orderBy: {{field: CREATED_AT, direction: DESC}}) {{
+          pageInfo {{
             endCursor
             hasNextPage
-          }
-          nodes {
+          }}
+          nodes {{
             title
             url
             number
             createdAt
+            author {{
+              login
+            }}
+          }}
+        }}
+      }}"""
+        for name in repo_names
+    )
+    return f"""
+    query GetRepoIssues($owner: String!{page_vars}) {{{repo_selections}
+    }}
+    """
+
+
+# PR states that are filtered server-side through the search API instead of listing every open PR
+PR_SEARCH_DRAFT_QUALIFIERS = {
+    "DRAFT": "draft:true",
+    "OPEN": "draft:false",
+}
+
+
+# Status indicator shown for each PR reviewDecision value
+REVIEW_DECISION_LABELS = {
+    "APPROVED": "✅ Approved",
+    "CHANGES_REQUESTED": "🔄 Changes Requested",
+    "REVIEW_REQUIRED": "👀 Review Required",
+}
+
+
+@lru_cache(maxsize=32)
+def build_prs_query(repo_names: tuple, state_filter: typing.Optional[str] = None) -> str:
+    """Build one GraphQL document that fetches a page of pull requests for every repository via aliases.
+
+    Draft-only and non-draft requests use search(...) so GitHub does the draft filtering;
+    everything else lists the repository's pullRequests connection. Cached per repo set and filter.
+    """
+    pr_fields = """
+            title
+            url
+            number
+            createdAt
+            isDraft
             author {
               login
             }
-            labels(first: 10) {
-              nodes {
-                name
-                color
-              }
-            }
-          }
-        }
-      }
-    }
+            reviewDecision"""
+    page_vars = "".join(f", $first_{repo_alias(name)}: Int!, $cursor_{repo_alias(name)}: String" for name in repo_names)
+    draft_qualifier = PR_SEARCH_DRAFT_QUALIFIERS.get(state_filter)
+
+    if draft_qualifier:
+        repo_selections = "".join(
+            f"""
+      {repo_alias(name)}: search(query: "repo:{GITHUB_ORG_NAME}/{name} is:pr is:open {draft_qualifier} sort:created-desc", type: ISSUE, first: $first_{repo_alias(name)}, after: $cursor_{repo_alias(name)}) {{
+        pageInfo {{
+          endCursor
+          hasNextPage
+        }}
+        nodes {{
+          ... on PullRequest {{{pr_fields}
+          }}
+        }}
+      }}"""
+            for name in repo_names
+        )
+        return f"""
+    query SearchRepoPRs({page_vars[2:]}) {{{repo_selections}
+    }}
     """
 
-    # Fetch issues from each repository
-    for repo_name in repos_to_query:
-        current_cursor = None
-        has_next_page = True
-        page_count = 0
-
-        while has_next_page:
-            page_count += 1
-            variables = {
-                "owner": GITHUB_ORG_NAME,
-                "name": repo_name,
-                "first": ITEMS_PER_PAGE,
-                "cursor": current_cursor,
-            }
+    repo_selections = "".join(
+        f"""
+      {repo_alias(name)}: repository(owner: $owner, name: "{name}") {{
+        pullRequests(first: $first_{repo_alias(name)}, after: $cursor_{repo_alias(name)}, states: $states, orderBy: {{field: CREATED_AT, direction: DESC}}) {{
+          pageInfo {{
+            endCursor
+            hasNextPage
+          }}
+          nodes {{{pr_fields}
+          }}
+        }}
+      }}"""
+        for name in repo_names
+    )
+    return f"""
+    query GetRepoPRs($owner: String!, $states: [PullRequestState!]{page_vars}) {{{repo_selections}
+    }}
+    """
 
-            try:
-                resp = requests.post(GRAPHQL_URL, headers=HEADERS, json={"query": graphql_query_template, "variables": variables})
-                resp.raise_for_status()
-            except requests.exceptions.RequestException as e:
-                await interaction.followup.send(f"❌ Failed to connect to GitHub API for {repo_name} (Page {page_count}): {e}", ephemeral=True)
-                return
 
-            try:
-                data = resp.json()
-            except Exception as e:
-                await interaction.followup.send(f"❌ Failed to parse GitHub API response for {repo_name} (Page {page_count}): {e}", ephemeral=True)
-                return
-
-            gql_errors = data.get("errors")
-            if gql_errors:
-                error_messages = [err.get("message", "Unknown GraphQL error") for err in gql_errors]
-                full_error_msg = f"❌ GitHub API Error(s) for {repo_name} (Page {page_count}):\n" + "\n".join(f"- {msg}" for msg in error_messages)
-                await interaction.followup.send(full_error_msg[:1900], ephemeral=True)
-                return
-
-            data_root = data.get("data", {})
-            repository_data = data_root.get("repository")
+async def fetch_paginated(session: aiohttp.ClientSession, repo_names: list, max_fetch: int, build_query, base_variables: dict, extract_connection) -> tuple:
+    """Fetch up to max_fetch nodes (newest first) per repository, one aliased request per page for all repos.
+
+    build_query(repo_names_tuple) returns the aliased document, base_variables holds the variables shared by
+    every repo, and extract_connection(alias_data) returns the connection ({pageInfo, nodes}) for one repo.
+    Returns (items_by_repo, fetch_errors). A repo that fails is recorded in fetch_errors and the others keep going.
+    """
+    items_by_repo = {name: [] for name in repo_names}
+    fetch_errors = {}
+    cursors = {name: None for name in repo_names}
+    pending_repos = list(repo_names)
+    page_count = 0
+
+    while pending_repos:
+        page_count += 1
+        variables = dict(base_variables)
+        for name in pending_repos:
+            # Request exactly the number of items this repo still needs (at most one full page)
+            variables[f"first_{repo_alias(name)}"] = min(ITEMS_PER_PAGE, max(1, max_fetch - len(items_by_repo[name])))
+            variables[f"cursor_{repo_alias(name)}"] = cursors[name]
+
+        try:
+            data = await post_graphql(session, build_query(tuple(pending_repos)), variables, ", ".join(pending_repos), page_count)
+        except GitHubFetchError as e:
+            # The whole request failed; keep what earlier pages returned and stop paginating
+            for name in pending_repos:
+                fetch_errors[name] = str(e)
+            break
+        data_root = data.get("data") or {}
+
+        for repo_name in list(pending_repos):
+            repository_data = data_root.get(repo_alias(repo_name))
             if not repository_data:
-                await interaction.followup.send(f"❌ Repository '{repo_name}' not found or not accessible in '{GITHUB_ORG_NAME}'. Check token permissions.", ephemeral=True)
-                return
-
-            issues_data = repository_data.get("issues", {})
-            page_issues = issues_data.get("nodes", [])
-            
-            # Add repository name to each issue for display
-            for issue in page_issues:
-                if issue:
-                    issue["repository"] = repo_name
-                    all_issues.append(issue)
-
-            page_info = issues_data.get("pageInfo", {})
-            has_next_page = page_info.get("hasNextPage", False)
-            current_cursor = page_info.get("endCursor")
-
-            # Limit total issues to prevent excessive API calls and embed size issues
-            # Be more conservative when showing multiple repositories
-            max_fetch = MAX_ITEMS_TO_DISPLAY if len(repos_to_query) == 1 else MAX_ITEMS_TO_DISPLAY // 2
-            if len(all_issues) >= max_fetch:
-                has_next_page = False
-
-    # Sort all issues by creation date (newest first)
-    all_issues.sort(key=lambda x: x.get("createdAt", ""), reverse=True)
+                fetch_errors[repo_name] = repo_error_message(data, repo_name)
+                pending_repos.remove(repo_name)
+                continue
+
+            connection = extract_connection(repository_data)
+
+            # Add repository name to each item for display
+            for node in connection.get("nodes", []):
+                if node:
+                    node["repository"] = repo_name
+                    items_by_repo[repo_name].append(node)
+
+            page_info = connection.get("pageInfo", {})
+            cursors[repo_name] = page_info.get("endCursor")
+
+            # Limit total items to prevent excessive API calls and embed size issues
+            if not page_info.get("hasNextPage", False) or len(items_by_repo[repo_name]) >= max_fetch:
+                pending_repos.remove(repo_name)
+
+    return items_by_repo, fetch_errors
+
+
+async def fetch_issues(session: aiohttp.ClientSession, repo_names: list, max_fetch: int) -> tuple:
+    """Fetch open issues for each repository. See fetch_paginated for the return value."""
+    return await fetch_paginated(
+        session, repo_names, max_fetch,
+        build_issues_query,
+        {"owner": GITHUB_ORG_NAME},
+        lambda repository_data: repository_data.get("issues", {}),
+    )
+
+
+async def fetch_prs(session: aiohttp.ClientSession, repo_names: list, max_fetch: int, pr_states: list, state_filter: typing.Optional[str]) -> tuple:
+    """Fetch pull requests for each repository. See fetch_paginated for the return value.
+
+    The draft filter for DRAFT/OPEN is applied server-side by the search query.
+    """
+    if state_filter in PR_SEARCH_DRAFT_QUALIFIERS:
+        return await fetch_paginated(
+            session, repo_names, max_fetch,
+            lambda repos: build_prs_query(repos, state_filter),
+            {},
+            lambda search_data: search_data,
+        )
+    return await fetch_paginated(
+        session, repo_names, max_fetch,
+        build_prs_query,
+        {"owner": GITHUB_ORG_NAME, "states": pr_states},
+        lambda repository_data: repository_data.get("pullRequests", {}),
+    )
+
+
+def format_issue_line(issue: dict) -> str:
+    """Format one issue as a line of embed field text."""
+    title = issue.get("title", "Untitled")
+    number = issue.get("number", "")
+    url = issue.get("url", "")
+    author = issue.get("author", {}).get("login", "Unknown") if issue.get("author") else "Unknown"
+
+    if url and number:
+        return f"[[#{number}]({url})] {title} - @{author}"
+    return f"[#{number}] {title} - @{author}"
+
+
+def format_pr_line(pr: dict) -> str:
+    """Format one pull request as a line of embed field text, including its status indicators."""
+    title = pr.get("title", "Untitled")
+    number = pr.get("number", "")
+    url = pr.get("url", "")
+    author = pr.get("author", {}).get("login", "Unknown") if pr.get("author") else "Unknown"
+
+    # Create status indicators
+    status_indicators = []
+    if pr.get("isDraft", False):
+        status_indicators.append("🚧 Draft")
+    review_label = REVIEW_DECISION_LABELS.get(pr.get("reviewDecision", ""))
+    if review_label:
+        status_indicators.append(review_label)
+
+    status_text = " " + " ".join(status_indicators) if status_indicators else ""
+
+    if url and number:
+        return f"[[#{number}]({url})] {title} - @{author}{status_text}"
+    return f"[#{number}] {title} - @{author}{status_text}"
+
+
+def build_field_chunks(lines: list) -> list:
+    """Pack lines into newline-separated chunks that each fit in one embed field."""
+    field_chunks = []
+    chunk_buffer = io.StringIO()
+    chunk_size = 0
+
+    for line in lines:
+        # Truncate if too long
+        if len(line) > DISCORD_FIELD_CHAR_LIMIT:
+            line = line[:DISCORD_FIELD_CHAR_LIMIT - 4] + "..."
+
+        # Start a new chunk if adding this line (plus a newline) would exceed the field limit
+        if chunk_size and chunk_size + 1 + len(line) > DISCORD_FIELD_CHAR_LIMIT:
+            field_chunks.append(chunk_buffer.getvalue())
+            chunk_buffer = io.StringIO()
+            chunk_size = 0
+
+        if chunk_size:
+            chunk_buffer.write("\n")
+            chunk_size += 1
+        chunk_buffer.write(line)
+        chunk_size += len(line)
+
+    if chunk_size:
+        field_chunks.append(chunk_buffer.getvalue())
+
+    return field_chunks
+
+
+async def run_list_command(
+    interaction: discord.Interaction,
+    repository: typing.Optional[discord.app_commands.Choice[str]],
+    fetch,
+    format_line,
+    title_prefix: str,
+    item_label: str,
+    field_label: str,
+    footer_label: str,
+    color: discord.Color,
+):
+    """Shared body of /issues and /prs: fetch items per repository, then render them as a grouped, size-limited embed.
+
+    fetch(session, repos_to_query, max_fetch) returns (items_by_repo, fetch_errors); format_line renders one item.
+    item_label (e.g. "open issues"), field_label (e.g. "Issues") and footer_label (e.g. "open issues") fill the text.
+    """
+    await interaction.response.defer()
+
+    # Determine which repositories to query
+    if repository is None or repository.value == "Both":
+        repos_to_query = ["Mantis", "MantisAPI"]
+        repo_display = "Both repositories"
+    else:
+        repos_to_query = [repository.value]
+        repo_display = repository.value
+
+    # Be more conservative when showing multiple repositories
+    max_fetch = MAX_ITEMS_TO_DISPLAY if len(repos_to_query) == 1 else MAX_ITEMS_TO_DISPLAY // 2
+
+    # Fetch from all repositories in a single aliased GraphQL request per page
+    items_by_repo, fetch_errors = await fetch(get_http_session(), repos_to_query, max_fetch)
+    if len(fetch_errors) == len(repos_to_query) and not any(items_by_repo.values()):
+        await interaction.followup.send("\n".join(fetch_errors.values())[:1900], ephemeral=True)
+        return
+
+    # Each repo's items are already newest-first, so merge instead of re-sorting
+    all_items = merge_newest_first(items_by_repo)
 
     # Limit display - be more conservative when showing multiple repositories
     if len(repos_to_query) > 1:
@@ -165,93 +398,149 @@ async def issues(
     else:
         # When showing single repo, use full limit
         max_display = MAX_ITEMS_TO_DISPLAY
-    
-    issues_to_display = all_issues[:max_display]
+
+    items_to_display = all_items[:max_display]
 
     # Build embed
-    embed_title = f"Open Issues - {repo_display}"
     embed = discord.Embed(
-        title=embed_title,
-        color=discord.Color.green(),
-        description=f"Showing {len(issues_to_display)}/{len(all_issues)} most recent open issues"
+        title=f"{title_prefix} - {repo_display}",
+        color=color,
+        description=f"Showing {len(items_to_display)}/{len(all_items)} most recent {item_label}"
     )
 
-    if not issues_to_display:
-        embed.add_field(name="No Issues Found", value="No open issues found in the specified repositories.", inline=False)
+    # Warn about repositories that could not be (fully) fetched, ahead of the results
+    fields = [(f"⚠️ Failed to fetch {repo}", error[:DISCORD_FIELD_CHAR_LIMIT]) for repo, error in fetch_errors.items()]
+    if not items_to_display:
+        fields.append((f"No {field_label} Found", f"No {item_label} found in the specified repositories."))
     else:
-        # Group issues by repository for better organization
-        repo_groups = {}
-        for issue in issues_to_display:
-            repo = issue.get("repository", "Unknown")
-            if repo not in repo_groups:
-                repo_groups[repo] = []
-            repo_groups[repo].append(issue)
-
-        for repo, repo_issues in repo_groups.items():
-            field_chunks = []
-            current_chunk_lines = []
-            current_chunk_char_count = 0
-
-            for issue in repo_issues:
-                title = issue.get("title", "Untitled")
-                number = issue.get("number", "")
-                url = issue.get("url", "")
-                author = issue.get("author", {}).get("login", "Unknown") if issue.get("author") else "Unknown"
-                
-                # Create issue display text
-                if url and number:
-                    issue_text = f"[[#{number}]({url})] {title} - @{author}"
-                else:
-                    issue_text = f"[#{number}] {title} - @{author}"
-
-                # Truncate if too long
-                if len(issue_text) > DISCORD_FIELD_CHAR_LIMIT:
-                    issue_text = issue_text[:DISCORD_FIELD_CHAR_LIMIT - 4] + "..."
-
-                # Check if adding this issue would exceed field limit
-                len_with_newline = len(issue_text) + (1 if current_chunk_lines else 0)
-                
-                if current_chunk_char_count + len_with_newline <= DISCORD_FIELD_CHAR_LIMIT:
-                    current_chunk_lines.append(issue_text)
-                    current_chunk_char_count += len_with_newline
-                else:
-                    if current_chunk_lines:
-                        field_chunks.append("\n".join(current_chunk_lines))
-                    current_chunk_lines = [issue_text]
-                    current_chunk_char_count = len(issue_text)
-
-            if current_chunk_lines:
-                field_chunks.append("\n".join(current_chunk_lines))
+        # Group items by repository for better organization
+        repo_groups = defaultdict(list)
+        for item in items_to_display:
+            repo_groups[item.get("repository", "Unknown")].append(item)
+
+        for repo, repo_items in repo_groups.items():
+            field_chunks = build_field_chunks([format_line(item) for item in repo_items])
 
             # Add fields for this repository
             if not field_chunks:
-                embed.add_field(name=f"{repo} Issues", value="_(No displayable issues)_", inline=False)
+                fields.append((f"{repo} {field_label}", f"_(No displayable {field_label.lower()})_"))
             else:
                 num_chunks = len(field_chunks)
                 for i, chunk_value in enumerate(field_chunks):
-                    field_name = f"{repo} Issues"
+                    field_name = f"{repo} {field_label}"
                     if num_chunks > 1:
                         field_name += f" (Part {i+1}/{num_chunks})"
-                    embed.add_field(name=field_name, value=chunk_value, inline=False)
-
-    embed.set_footer(text=f"Mantis AI Cognitive Cartography · {len(all_issues)} total open issues")
-    
-    # Safety check for embed size
-    embed_size = estimate_embed_size(embed)
-    if embed_size > 5500:  # Leave buffer below 6000 limit
-        # If embed is too large, remove some fields and add a warning
-        while len(embed.fields) > 1 and estimate_embed_size(embed) > 5500:
-            embed.remove_field(-1)  # Remove last field
-        
-        embed.add_field(
-            name="⚠️ Content Truncated",
-            value="Some items were hidden due to Discord's size limits. Try filtering by a specific repository.",
-            inline=False
-        )
-    
+                    fields.append((field_name, chunk_value))
+
+    # Drop trailing fields if needed to stay under Discord's size limit
+    add_fields_within_size_limit(embed, fields, f"Mantis AI Cognitive Cartography · {len(all_items)} total {footer_label}")
+
     await interaction.followup.send(embed=embed)
 
 
+def repo_error_message(data: dict, repo_name: str) -> str:
+    """Build the error shown for a repository whose aliased selection came back empty."""
+    alias = repo_alias(repo_name)
+    error_messages = [
+        err.get("message", "Unknown GraphQL error")
+        for err in data.get("errors") or []
+        if (err.get("path") or [None])[0] == alias
+    ]
+    if error_messages:
+        return f"❌ GitHub API Error(s) for {repo_name}: " + "; ".join(error_messages)
+    return f"❌ Repository '{repo_name}' not found or not accessible in '{GITHUB_ORG_NAME}'. Check token permissions."
+
+
+def merge_newest_first(items_by_repo: dict) -> list:
+    """Merge per-repo lists that GitHub already returned newest-first into one newest-first list."""
+    repo_lists = list(items_by_repo.values())
+    if len(repo_lists) == 1:
+        return repo_lists[0]
+    return list(heapq.merge(*repo_lists, key=lambda x: x.get("createdAt", ""), reverse=True))
+
+
+async def post_graphql(session: aiohttp.ClientSession, query: str, variables: dict, repo_label: str, page_count: int) -> dict:
+    """POST a GraphQL query to GitHub and return the decoded response, raising GitHubFetchError on failure.
+
+    HTTP errors fail fast before the body is read. If GraphQL reports errors but some aliases still
+    returned data, the partial response is returned so callers can keep the repos that succeeded.
+    Fully successful responses are cached briefly; the key covers the repos (via the query) plus states and cursors (via the variables).
+    """
+    cache_key = (query, orjson.dumps(variables, option=orjson.OPT_SORT_KEYS))
+    cached_data = graphql_response_cache.get(cache_key)
+    if cached_data is not None:
+        return cached_data
+
+    try:
+        # Encode/decode with orjson; the session already sends Content-Type: application/json
+        async with session.post(GRAPHQL_URL, data=orjson.dumps({"query": query, "variables": variables})) as resp:
+            resp.raise_for_status()
+            try:
+                data = orjson.loads(await resp.read())
+            except Exception as e:
+                raise GitHubFetchError(f"❌ Failed to parse GitHub API response for {repo_label} (Page {page_count}): {e}") from e
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        raise GitHubFetchError(f"❌ Failed to connect to GitHub API for {repo_label} (Page {page_count}): {e}") from e
+
+    gql_errors = data.get("errors")
+    if gql_errors and any((data.get("data") or {}).values()):
+        return data
+    if gql_errors:
+        error_messages = [err.get("message", "Unknown GraphQL error") for err in gql_errors]
+        full_error_msg = f"❌ GitHub API Error(s) for {repo_label} (Page {page_count}):\n" + "\n".join(f"- {msg}" for msg in error_messages)
+        raise GitHubFetchError(full_error_msg[:1900])
+
+    graphql_response_cache[cache_key] = data
+    return data
+
+
+class IssuePRSession(commands.Cog):
+    """Owns the shared GitHub session; the bot removes its cogs on shutdown, which closes the session."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    async def cog_unload(self):
+        graphql_response_cache.clear()
+        await close_http_session()
+
+
+def setup(bot):
+    """Register issue and PR commands with the bot."""
+    bot.tree.add_command(issues)
+    bot.tree.add_command(prs)
+
+
+@discord.app_commands.command(
+    name="issues",
+    description=f"View open issues in {GITHUB_ORG_NAME} repositories (Mantis and MantisAPI).",
+)
+@discord.app_commands.describe(
+    repository="Filter by specific repository (default: both).",
+)
+@discord.app_commands.choices(repository=[
+    discord.app_commands.Choice(name="Mantis", value="Mantis"),
+    discord.app_commands.Choice(name="MantisAPI", value="MantisAPI"),
+    discord.app_commands.Choice(name="Both", value="Both"),
+])
+async def issues(
+    interaction: discord.Interaction,
+    repository: typing.Optional[discord.app_commands.Choice[str]] = None,
+):
+    """Fetches open issues from KellisLab repositories and displays them."""
+    await run_list_command(
+        interaction,
+        repository,
+        fetch=fetch_issues,
+        format_line=format_issue_line,
+        title_prefix="Open Issues",
+        item_label="open issues",
+        field_label="Issues",
+        footer_label="open issues",
+        color=discord.Color.green(),
+    )
+
+
 @discord.app_commands.command(
     name="prs",
     description=f"View open and draft pull requests in {GITHUB_ORG_NAME} repositories (Mantis and MantisAPI).",
@@ -278,237 +567,24 @@ async def prs(
     state: typing.Optional[discord.app_commands.Choice[str]] = None,
 ):
     """Fetches open and draft pull requests from KellisLab repositories and displays them."""
-    await interaction.response.defer()
-
-    # Determine which repositories to query
-    repos_to_query = []
-    if repository is None or repository.value == "Both":
-        repos_to_query = ["Mantis", "MantisAPI"]
-        repo_display = "Both repositories"
-    else:
-        repos_to_query = [repository.value]
-        repo_display = repository.value
-
-    # Determine PR states to query
-    pr_states = []
-    state_display = "Open"
+    # Determine PR states to query; draft PRs are technically OPEN but with isDraft=true
+    pr_states = ["OPEN"]
+    state_filter = state.value if state else None
     if state is None or state.value == "OPEN":
-        pr_states = ["OPEN"]
         state_display = "Open"
     elif state.value == "DRAFT":
-        pr_states = ["OPEN"]  # Draft PRs are technically OPEN but with isDraft=true
         state_display = "Draft"
     else:  # BOTH
-        pr_states = ["OPEN"]
         state_display = "Open + Draft"
 
-    all_prs = []
-
-    # GraphQL query template for pull requests
-    graphql_query_template = """
-    query GetRepoPRs($owner: String!, $name: String!, $first: Int!, $cursor: String, $states: [PullRequestState!]) {
-      repository(owner: $owner, name: $name) {
-        pullRequests(first: $first, after: $cursor, states: $states, orderBy: {field: CREATED_AT, direction: DESC}) {
-          pageInfo {
-            endCursor
-            hasNextPage
-          }
-          nodes {
-            title
-            url
-            number
-            createdAt
-            isDraft
-            author {
-              login
-            }
-            baseRefName
-            headRefName
-            mergeable
-            reviewDecision
-          }
-        }
-      }
-    }
-    """
-
-    # Fetch PRs from each repository
-    for repo_name in repos_to_query:
-        current_cursor = None
-        has_next_page = True
-        page_count = 0
-
-        while has_next_page:
-            page_count += 1
-            variables = {
-                "owner": GITHUB_ORG_NAME,
-                "name": repo_name,
-                "first": ITEMS_PER_PAGE,
-                "cursor": current_cursor,
-                "states": pr_states,
-            }
-
-            try:
-                resp = requests.post(GRAPHQL_URL, headers=HEADERS, json={"query": graphql_query_template, "variables": variables})
-                resp.raise_for_status()
-            except requests.exceptions.RequestException as e:
-                await interaction.followup.send(f"❌ Failed to connect to GitHub API for {repo_name} (Page {page_count}): {e}", ephemeral=True)
-                return
-
-            try:
-                data = resp.json()
-            except Exception as e:
-                await interaction.followup.send(f"❌ Failed to parse GitHub API response for {repo_name} (Page {page_count}): {e}", ephemeral=True)
-                return
-
-            gql_errors = data.get("errors")
-            if gql_errors:
-                error_messages = [err.get("message", "Unknown GraphQL error") for err in gql_errors]
-                full_error_msg = f"❌ GitHub API Error(s) for {repo_name} (Page {page_count}):\n" + "\n".join(f"- {msg}" for msg in error_messages)
-                await interaction.followup.send(full_error_msg[:1900], ephemeral=True)
-                return
-
-            data_root = data.get("data", {})
-            repository_data = data_root.get("repository")
-            if not repository_data:
-                await interaction.followup.send(f"❌ Repository '{repo_name}' not found or not accessible in '{GITHUB_ORG_NAME}'. Check token permissions.", ephemeral=True)
-                return
-
-            prs_data = repository_data.get("pullRequests", {})
-            page_prs = prs_data.get("nodes", [])
-            
-            # Filter by draft status if needed and add repository name
-            for pr in page_prs:
-                if pr:
-                    pr["repository"] = repo_name
-                    
-                    # Apply draft filtering
-                    if state and state.value == "DRAFT":
-                        if pr.get("isDraft"):
-                            all_prs.append(pr)
-                    elif state and state.value == "OPEN":
-                        if not pr.get("isDraft"):
-                            all_prs.append(pr)
-                    else:  # BOTH or None (default to all open)
-                        all_prs.append(pr)
-
-            page_info = prs_data.get("pageInfo", {})
-            has_next_page = page_info.get("hasNextPage", False)
-            current_cursor = page_info.get("endCursor")
-
-            # Limit total PRs to prevent excessive API calls and embed size issues
-            # Be more conservative when showing multiple repositories
-            max_fetch = MAX_ITEMS_TO_DISPLAY if len(repos_to_query) == 1 else MAX_ITEMS_TO_DISPLAY // 2
-            if len(all_prs) >= max_fetch:
-                has_next_page = False
-
-    # Sort all PRs by creation date (newest first)
-    all_prs.sort(key=lambda x: x.get("createdAt", ""), reverse=True)
-
-    # Limit display - be more conservative when showing multiple repositories
-    if len(repos_to_query) > 1:
-        # When showing both repos, limit to 25 total items to prevent embed size issues
-        max_display = min(MAX_ITEMS_TO_DISPLAY // 2, 25)
-    else:
-        # When showing single repo, use full limit
-        max_display = MAX_ITEMS_TO_DISPLAY
-    
-    prs_to_display = all_prs[:max_display]
-
-    # Build embed
-    embed_title = f"{state_display} Pull Requests - {repo_display}"
-    embed = discord.Embed(
-        title=embed_title,
+    await run_list_command(
+        interaction,
+        repository,
+        fetch=lambda session, repos, max_fetch: fetch_prs(session, repos, max_fetch, pr_states, state_filter),
+        format_line=format_pr_line,
+        title_prefix=f"{state_display} Pull Requests",
+        item_label=f"{state_display.lower()} pull requests",
+        field_label="Pull Requests",
+        footer_label=f"{state_display.lower()} PRs",
         color=discord.Color.blue(),
-        description=f"Showing {len(prs_to_display)}/{len(all_prs)} most recent {state_display.lower()} pull requests"
     )
-
-    if not prs_to_display:
-        embed.add_field(name="No Pull Requests Found", value=f"No {state_display.lower()} pull requests found in the specified repositories.", inline=False)
-    else:
-        # Group PRs by repository for better organization
-        repo_groups = {}
-        for pr in prs_to_display:
-            repo = pr.get("repository", "Unknown")
-            if repo not in repo_groups:
-                repo_groups[repo] = []
-            repo_groups[repo].append(pr)
-
-        for repo, repo_prs in repo_groups.items():
-            field_chunks = []
-            current_chunk_lines = []
-            current_chunk_char_count = 0
-
-            for pr in repo_prs:
-                title = pr.get("title", "Untitled")
-                number = pr.get("number", "")
-                url = pr.get("url", "")
-                author = pr.get("author", {}).get("login", "Unknown") if pr.get("author") else "Unknown"
-                is_draft = pr.get("isDraft", False)
-                review_decision = pr.get("reviewDecision", "")
-                
-                # Create status indicators
-                status_indicators = []
-                if is_draft:
-                    status_indicators.append("🚧 Draft")
-                if review_decision == "APPROVED":
-                    status_indicators.append("✅ Approved")
-                elif review_decision == "CHANGES_REQUESTED":
-                    status_indicators.append("🔄 Changes Requested")
-                elif review_decision == "REVIEW_REQUIRED":
-                    status_indicators.append("👀 Review Required")
-
-                status_text = " " + " ".join(status_indicators) if status_indicators else ""
-                
-                # Create PR display text
-                if url and number:
-                    pr_text = f"[[#{number}]({url})] {title} - @{author}{status_text}"
-                else:
-                    pr_text = f"[#{number}] {title} - @{author}{status_text}"
-
-                # Truncate if too long
-                if len(pr_text) > DISCORD_FIELD_CHAR_LIMIT:
-                    pr_text = pr_text[:DISCORD_FIELD_CHAR_LIMIT - 4] + "..."
-
-                # Check if adding this PR would exceed field limit
-                len_with_newline = len(pr_text) + (1 if current_chunk_lines else 0)
-                
-                if current_chunk_char_count + len_with_newline <= DISCORD_FIELD_CHAR_LIMIT:
-                    current_chunk_lines.append(pr_text)
-                    current_chunk_char_count += len_with_newline
-                else:
-                    if current_chunk_lines:
-                        field_chunks.append("\n".join(current_chunk_lines))
-                    current_chunk_lines = [pr_text]
-                    current_chunk_char_count = len(pr_text)
-
-            if current_chunk_lines:
-                field_chunks.append("\n".join(current_chunk_lines))
-
-            # Add fields for this repository
-            if not field_chunks:
-                embed.add_field(name=f"{repo} Pull Requests", value="_(No displayable pull requests)_", inline=False)
-            else:
-                num_chunks = len(field_chunks)
-                for i, chunk_value in enumerate(field_chunks):
-                    field_name = f"{repo} Pull Requests"
-                    if num_chunks > 1:
-                        field_name += f" (Part {i+1}/{num_chunks})"
-                    embed.add_field(name=field_name, value=chunk_value, inline=False)
-
-    embed.set_footer(text=f"Mantis AI Cognitive Cartography · {len(all_prs)} total {state_display.lower()} PRs")
-    
-    # Safety check for embed size
-    embed_size = estimate_embed_size(embed)
-    if embed_size > 5500:  # Leave buffer below 6000 limit
-        # If embed is too large, remove some fields and add a warning
-        while len(embed.fields) > 1 and estimate_embed_size(embed) > 5500:
-            embed.remove_field(-1)  # Remove last field
-        
-        embed.add_field(
-            name="⚠️ Content Truncated",
-            value="Some items were hidden due to Discord's size limits. Try filtering by a specific repository.",
-            inline=False
-        )
-    
-    await interaction.followup.send(embed=embed) 
\ No newline at end of file
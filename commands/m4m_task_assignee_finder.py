@@ -2,51 +2,113 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from config import M4M_PARTICIPANT_LIST, M4M_ONLY_CONSIDER_AFFILIATION, HEADERS, ASSISTANT_ID, OPENAI_API_KEY
-from typing import Any
-import requests
-from io import StringIO
+from typing import Optional
+from dataclasses import dataclass, field
+import aiohttp
 import csv
 import random
 import re
 import time
 import openai
-from collections import defaultdict, Counter
-import json
+from collections import Counter
+import orjson
 import asyncio
 import traceback
+import hashlib
+import heapq
+from operator import itemgetter
 from utils.meeting_transcripts_api import MeetingTranscriptsAPI
-from functools import lru_cache
 import cachetools
 
 # Cache for members list
 members_cache = cachetools.TTLCache(maxsize=1, ttl=3600)
 
+# Validators from the last full download of the members sheet, used for conditional requests
+members_sheet_state: dict[str, Optional[str]] = {"etag": None, "last_modified": None, "members_string": None}
+
+# Phone numbers and emails by member name. They are left out of the prompt and added back into replies
+member_contacts: dict[str, str] = {}
+member_name_re: Optional[re.Pattern] = None
+
 # Cache for fallback recommendations
 fallback_cache = cachetools.TTLCache(maxsize=1, ttl=7200)
 
+# Cache for GitHub issue info, keyed by issue path; expires so edited issues are picked up
+issue_info_cache = cachetools.TTLCache(maxsize=256, ttl=600)
+
+# (ETag, issue info) from the last full response per issue path, for conditional requests after expiry
+issue_info_validators = cachetools.LRUCache(maxsize=256)
+
+# Cache for primary assistant recommendations, keyed by a hash of the task and members list
+recommendation_cache = cachetools.TTLCache(maxsize=256, ttl=1800)
+
+# Shared aiohttp session for GitHub and Google Sheets requests (created lazily inside the event loop)
+http_session: Optional[aiohttp.ClientSession] = None
+
 client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
 
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Return the shared aiohttp session, creating it on first use.
+
+    One connector is reused so DNS lookups and TLS handshakes are amortized across requests.
+    """
+    global http_session
+    if http_session is None or http_session.closed:
+        http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(total=30),
+        )
+    return http_session
+
 # Development: testing the fallback heuristic without an actual OpenAI API failure.
 FORCE_FALLBACK_TEST = False
 
+# Matches a GitHub issue URL and captures (owner, repo, issue number)
+GITHUB_ISSUE_URL_RE = re.compile(r'https://github\.com/([^/]+)/([^/]+)/issues/(\d+)')
+
+# Replies run_assistant gives when the run did not complete; these are never cached
+ASSISTANT_TIMEOUT_REPLY = "The assistant took too long to respond. Please try again."
+ASSISTANT_ERROR_REPLY = "Sorry, an error occurred while communicating with the assistant."
+ASSISTANT_FAILED_REPLY_PREFIX = "The assistant run failed with status:"
+
+# Polling backoff for assistant runs: start short so quick runs return promptly, then back off
+RUN_POLL_INITIAL_DELAY = 0.15
+RUN_POLL_MAX_DELAY = 2.0
+
 # --- Helper Function to Run Assistant ---
-async def run_assistant(user_message: str, timeout_seconds: int = 90) -> str:
+async def run_assistant(user_message: str, timeout_seconds: int = 90, thread_id: Optional[str] = None) -> tuple[str, Optional[str]]:
+    """Run the assistant on user_message and return (reply, thread_id).
+
+    Pass the thread_id from a previous call to continue that conversation; the thread keeps the
+    history, so only the new message is sent. A new thread is created when thread_id is None.
+    """
     try:
-        thread = await client.beta.threads.create()
-        await client.beta.threads.messages.create(thread_id=thread.id, role="user", content=user_message)
-        run = await client.beta.threads.runs.create(thread_id=thread.id, assistant_id=ASSISTANT_ID)
+        if thread_id is None:
+            thread = await client.beta.threads.create()
+            thread_id = thread.id
+        await client.beta.threads.messages.create(thread_id=thread_id, role="user", content=user_message)
+        run = await client.beta.threads.runs.create(thread_id=thread_id, assistant_id=ASSISTANT_ID)
         start_time = time.time()
+        poll_delay = RUN_POLL_INITIAL_DELAY
 
         while run.status in ["queued", "in_progress", "requires_action"]:
             if time.time() - start_time > timeout_seconds:
-                return "The assistant took too long to respond. Please try again."
+                # Cancel the run so the thread can accept the user's next message
+                try:
+                    await client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run.id)
+                except Exception as e:
+                    print(f"Failed to cancel timed out assistant run: {e}")
+                return ASSISTANT_TIMEOUT_REPLY, thread_id
 
             if run.status == "requires_action":
+                # Submitting outputs restarts the run, which usually finishes soon after
+                poll_delay = RUN_POLL_INITIAL_DELAY
                 tool_outputs = []
                 transcripts_api = MeetingTranscriptsAPI()
                 for tool_call in run.required_action.submit_tool_outputs.tool_calls:
                     function_name = tool_call.function.name
-                    function_args = json.loads(tool_call.function.arguments)
+                    function_args = orjson.loads(tool_call.function.arguments)
                     if function_name == "get_meeting_transcripts":
                         try:
                             team_name = function_args.get('team_name')
@@ -60,242 +122,356 @@ async def run_assistant(user_message: str, timeout_seconds: int = 90) -> str:
                                 limit=limit
                             )
                             if success:
-                                output = json.dumps(formatted_data)
+                                output = orjson.dumps(formatted_data).decode()
                             else:
-                                output = json.dumps({
+                                output = orjson.dumps({
                                     "meetings_summary": {"total_transcripts": 0, "error": "Failed to fetch transcripts"},
                                     "transcripts": [],
                                     "error": formatted_data.get('error', 'Unknown error')
-                                })
+                                }).decode()
                         except Exception as e:
-                            output = json.dumps({
+                            output = orjson.dumps({
                                 "meetings_summary": {"total_transcripts": 0, "error": f"Function execution error: {str(e)}"},
                                 "transcripts": [],
                                 "error": str(e)
-                            })
+                            }).decode()
                     else:
-                        output = json.dumps({"error": f"Unknown function: {function_name}"})
+                        output = orjson.dumps({"error": f"Unknown function: {function_name}"}).decode()
                     tool_outputs.append({"tool_call_id": tool_call.id, "output": output})
 
                 run = await client.beta.threads.runs.submit_tool_outputs(
-                    thread_id=thread.id,
+                    thread_id=thread_id,
                     run_id=run.id,
                     tool_outputs=tool_outputs
                 )
             else:
-                await asyncio.sleep(1)
-                run = await client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
+                await asyncio.sleep(poll_delay * random.uniform(0.8, 1.2))
+                poll_delay = min(poll_delay * 2, RUN_POLL_MAX_DELAY)
+                run = await client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
 
         if run.status == "completed":
-            messages = await client.beta.threads.messages.list(thread_id=thread.id)
+            # Messages are listed newest first, so this is the reply to the message just sent
+            messages = await client.beta.threads.messages.list(thread_id=thread_id)
             for msg in messages.data:
                 if msg.role == "assistant" and msg.content:
-                    return msg.content[0].text.value.strip()
+                    return msg.content[0].text.value.strip(), thread_id
 
-        return f"The assistant run failed with status: {run.status}"
+        return f"{ASSISTANT_FAILED_REPLY_PREFIX} {run.status}", thread_id
 
     except Exception as e:
         print(f"An error occurred while running the assistant: {e}")
         traceback.print_exc()
-        return "Sorry, an error occurred while communicating with the assistant."
+        return ASSISTANT_ERROR_REPLY, thread_id
 
 # --- Helper Function for GitHub API ---
-@lru_cache(maxsize=128)
-def get_issue_info_from_github(issue_path: str) -> str:
+async def get_issue_info_from_github(issue_path: str) -> str:
+    cached_info = issue_info_cache.get(issue_path)
+    if cached_info is not None:
+        return cached_info
+
     issue_api_url = f"https://api.github.com/repos/{issue_path}"
+    etag, previous_info = issue_info_validators.get(issue_path, (None, None))
+    headers = {**HEADERS, "If-None-Match": etag} if etag else HEADERS
     try:
-        response = requests.get(issue_api_url, headers=HEADERS)
-        response.raise_for_status()
-        response_json = response.json()
-        return f"Issue Title: {response_json.get('title', 'No title found')}\nIssue Description: {response_json.get('body', 'No description found')}"
+        async with get_http_session().get(issue_api_url, headers=headers) as response:
+            # Unchanged since the last download; GitHub doesn't count 304s against the rate limit
+            if response.status == 304 and previous_info is not None:
+                issue_info_cache[issue_path] = previous_info
+                return previous_info
+            response.raise_for_status()
+            response_json = orjson.loads(await response.read())
+            etag = response.headers.get("ETag")
+        issue_info = f"Issue Title: {response_json.get('title', 'No title found')}\nIssue Description: {response_json.get('body', 'No description found')}"
+        issue_info_cache[issue_path] = issue_info
+        if etag:
+            issue_info_validators[issue_path] = (etag, issue_info)
+        return issue_info
     except Exception as e:
         print(f"An error occurred while getting issue info: {e}")
         traceback.print_exc()
         return "Sorry, an error occurred while fetching the issue information."
 
 # --- Helper Function for CSV Data ---
-@cachetools.cached(cache=members_cache, key=lambda: 'members_list')
-def get_active_members_from_public_sheet() -> str:
-    response = requests.get(M4M_PARTICIPANT_LIST)
-    response.raise_for_status()
-    f = StringIO(response.text)
-    reader = csv.DictReader(f)
-    active_members_list = []
-    for row in reader:
-        if not M4M_ONLY_CONSIDER_AFFILIATION or (row.get("Teams", "") or row.get("Role", "")):
-            formatted_string = f"{row.get('Full Name')}: (Role): {row.get('Role', 'N/A')}, (Teams): {row.get('Teams', 'N/A')}, (WhatsApp Mobile Number): {row.get('WhatsApp Mobile number', 'N/A')}, (Email): {row.get('For Emailing')}"
-            active_members_list.append(formatted_string)
-    random.shuffle(active_members_list)
-    return "\n".join(active_members_list)
-
-@cachetools.cached(cache=fallback_cache, key=lambda: 'fallback_recommendations')
-def recommend_assignees_fallback_heuristic() -> str:
-    # Recommend assignees least frequently assigned to issues as a fallback (using GitHub GraphQL).
-    # Fallback if OpenAI API times out
-    query = """
-    query {
-    search(
-        type: ISSUE,
-        query: "org:KellisLab Mantis in:repository",
-        first: 100
-    ) {
+async def get_active_members_from_public_sheet() -> str:
+    cached_members = members_cache.get('members_list')
+    if cached_members is not None:
+        return cached_members
+
+    # Revalidate instead of re-downloading once the TTL expires; a 304 means the sheet is unchanged
+    conditional_headers = {}
+    if members_sheet_state["members_string"] is not None:
+        if members_sheet_state["etag"]:
+            conditional_headers["If-None-Match"] = members_sheet_state["etag"]
+        if members_sheet_state["last_modified"]:
+            conditional_headers["If-Modified-Since"] = members_sheet_state["last_modified"]
+
+    async with get_http_session().get(M4M_PARTICIPANT_LIST, headers=conditional_headers) as response:
+        if response.status == 304 and members_sheet_state["members_string"] is not None:
+            members_cache['members_list'] = members_sheet_state["members_string"]
+            return members_sheet_state["members_string"]
+        response.raise_for_status()
+        # Decode lines as the body arrives instead of building one string and wrapping it in StringIO
+        csv_lines = [line.decode("utf-8") async for line in response.content]
+        members_sheet_state["etag"] = response.headers.get("ETag")
+        members_sheet_state["last_modified"] = response.headers.get("Last-Modified")
+    reader = csv.reader(csv_lines)
+    header = next(reader, [])
+    # Look the columns up once instead of building a dict per row
+    i_name, i_role, i_teams, i_phone, i_email = (
+        header.index(column) for column in ("Full Name", "Role", "Teams", "WhatsApp Mobile number", "For Emailing")
+    )
+    rows = [
+        row for row in reader
+        if len(row) == len(header) and (not M4M_ONLY_CONSIDER_AFFILIATION or row[i_teams] or row[i_role])
+    ]
+    # Compact Name|Role|Teams rows keep the prompt small; contact details are spliced into the reply instead
+    active_members_list = [f"{row[i_name]}|{row[i_role]}|{row[i_teams]}".rstrip("|") for row in rows]
+    active_members_string = "\n".join(random.sample(active_members_list, len(active_members_list)))
+    update_member_contacts({
+        row[i_name]: ", ".join(detail for detail in (row[i_phone], row[i_email]) if detail)
+        for row in rows
+        if row[i_name] and (row[i_phone] or row[i_email])
+    })
+    members_cache['members_list'] = active_members_string
+    members_sheet_state["members_string"] = active_members_string
+    return active_members_string
+
+def update_member_contacts(contacts: dict[str, str]) -> None:
+    global member_contacts, member_name_re
+    member_contacts = contacts
+    # Longest names first so a full name wins over another member's shorter name it contains
+    names = sorted(contacts, key=len, reverse=True)
+    member_name_re = re.compile(r"(?<!\w)(?:" + "|".join(map(re.escape, names)) + r")(?!\w)") if names else None
+
+
+def add_member_contacts(reply: str) -> str:
+    """Add each member's phone number and email after the first mention of their name in reply."""
+    if member_name_re is None:
+        return reply
+    seen = set()
+
+    def splice(match: re.Match) -> str:
+        name = match.group(0)
+        if name in seen:
+            return name
+        seen.add(name)
+        return f"{name} ({member_contacts[name]})"
+
+    return member_name_re.sub(splice, reply)
+
+# Disjoint slices of the fallback issue search, fetched concurrently
+FALLBACK_SEARCH_PARTITIONS = ("is:open", "is:closed")
+FALLBACK_PAGES_PER_PARTITION = 2
+
+FALLBACK_ASSIGNEES_QUERY = """
+query($searchQuery: String!, $cursor: String) {
+search(type: ISSUE, query: $searchQuery, first: 100, after: $cursor) {
+    pageInfo {
+    hasNextPage
+    endCursor
+    }
+    nodes {
+    ... on Issue {
+        assignees(first: 10) {
         nodes {
-        ... on Issue {
-            title
-            url
-            repository {
-            name
-            }
-            assignees(first: 10) {
-            nodes {
-                login
-            }
-            }
+            login
         }
         }
     }
     }
-    """
-    try:
-        response = requests.post("https://api.github.com/graphql", headers=HEADERS, data=json.dumps({"query": query}))
-        response.raise_for_status()
-        data = response.json()
-        all_assignees = []
-        for node in data["data"]["search"]["nodes"]:
+}
+}
+"""
+
+
+async def fetch_fallback_assignee_logins(partition: str) -> list[str]:
+    """Collect assignee logins from one slice of the Mantis issue search, following its cursor."""
+    logins = []
+    cursor = None
+    for _ in range(FALLBACK_PAGES_PER_PARTITION):
+        variables = {"searchQuery": f"org:KellisLab Mantis in:repository {partition}", "cursor": cursor}
+        async with get_http_session().post("https://api.github.com/graphql", headers=HEADERS, data=orjson.dumps({"query": FALLBACK_ASSIGNEES_QUERY, "variables": variables})) as response:
+            response.raise_for_status()
+            search = orjson.loads(await response.read())["data"]["search"]
+        for node in search["nodes"]:
             try:
-                logins = node["assignees"]["nodes"]
-                for login in logins:
-                    all_assignees.append(login["login"])
-            except (KeyError, IndexError):
+                logins.extend(assignee["login"] for assignee in node["assignees"]["nodes"])
+            except (KeyError, TypeError):
                 continue
-        assignee_counts = Counter(all_assignees)
-        least_recorded_assignees_with_counts = assignee_counts.most_common()[:-8:-1]
-        final_message = "I had trouble connecting to OpenAI, but I found some members from GitHub who haven't been assigned to a task frequently. I'd recommending assigning the following people:\n\n"
-        for assignee, count in least_recorded_assignees_with_counts:
-            final_message = final_message + f"{assignee} (GitHub username), assigned {str(count)} times.\n"
+        if not search["pageInfo"]["hasNextPage"]:
+            break
+        cursor = search["pageInfo"]["endCursor"]
+    return logins
+
+
+async def recommend_assignees_fallback_heuristic() -> str:
+    # Recommend assignees least frequently assigned to issues as a fallback (using GitHub GraphQL).
+    # Fallback if OpenAI API times out
+    cached_message = fallback_cache.get('fallback_recommendations')
+    if cached_message is not None:
+        return cached_message
+
+    try:
+        # Search cursors are sequential, so the search is split into disjoint slices that page concurrently
+        logins_per_partition = await asyncio.gather(*(fetch_fallback_assignee_logins(partition) for partition in FALLBACK_SEARCH_PARTITIONS))
+        assignee_counts = Counter()
+        for logins in logins_per_partition:
+            assignee_counts.update(logins)
+        # Partial selection of the 7 least assigned instead of sorting every assignee
+        least_recorded_assignees_with_counts = heapq.nsmallest(7, assignee_counts.items(), key=itemgetter(1))
+        message_lines = ["I had trouble connecting to OpenAI, but I found some members from GitHub who haven't been assigned to a task frequently. I'd recommending assigning the following people:\n"]
+        message_lines.extend(f"{assignee} (GitHub username), assigned {count} times." for assignee, count in least_recorded_assignees_with_counts)
+        final_message = "\n".join(message_lines) + "\n"
+        fallback_cache['fallback_recommendations'] = final_message
         return final_message
     except Exception:
         return "Sorry, I'm having trouble accessing OpenAI and GitHub right now. Please try this command again later and let one of the developers know."
 
+# --- Session State ---
+@dataclass(slots=True)
+class AssigneeSession:
+    """Conversation state for one user's /m4m_find_assignee session."""
+    stage: int = 0
+    last_bot_message_id: Optional[int] = None
+    thread_id: Optional[str] = None
+    task: str = ""
+    members: Optional[str] = None
+    replies: list[str] = field(default_factory=list)
+    user_messages: list[str] = field(default_factory=list)
+
+
 # --- Assignee Recommendation Functions ---
-async def recommend_assignees_primary(task_given: str) -> str:
+# Prompt templates; only the task, members list and user request are filled in per call
+ASSIGNEE_LIST_INSTRUCTIONS = (
+    "Only list 5-8 assignees using markdown: "
+    "'1) Assignee Name. Reason for choosing: (Explanation)'. "
+    "Write each name exactly as it appears in the list. No prelude, epilogue, or follow-up questions.\n\n"
+)
+PRIMARY_PROMPT_TEMPLATE = (
+    "You are a helpful assistant that recommends assignees for a GitHub task. " + ASSIGNEE_LIST_INSTRUCTIONS
+    + "Task in need of an assignee:\n\n{task}\n"
+    "Available assignees (Name|Role|Teams):\n{members}\n\n"
+)
+FOLLOW_UP_PROMPT_TEMPLATE = (
+    "Recommend assignees again for the same task, taking into account all previous user requests and your past replies. "
+    "Use the same format and only list 5-8 assignees. No prelude, epilogue, or follow-up questions.\n\n"
+    "User request: {request}\n"
+)
+NEW_THREAD_FOLLOW_UP_PROMPT_TEMPLATE = (
+    "You are a helpful assistant recommending assignees for a GitHub task. " + ASSIGNEE_LIST_INSTRUCTIONS
+    + "Task in need of an assignee:\n\n{task}\n"
+    "User request: {request}\n"
+    "Available assignees (Name|Role|Teams):\n{members}\n\n"
+)
+MORE_ASSIGNEES_PROMPT = "\n\nLet me know if I should recommend more assignees!"
+
+async def recommend_assignees_primary(session: AssigneeSession) -> str:
+    """Recommend assignees for session.task, recording the members list and assistant thread on the session.
+
+    session.thread_id stays None if the fallback heuristic was used or the reply came from the cache; a
+    cached reply's thread belongs to whoever asked first, so follow-ups start a new thread instead.
+    """
+    session.thread_id = None
     try:
         if FORCE_FALLBACK_TEST:
             raise openai.APIStatusError(message="Forcing fallback for testing purposes.", response=None, body=None)
         
-        active_members_string = await asyncio.get_event_loop().run_in_executor(None, get_active_members_from_public_sheet)
-        user_prompt = (
-            "You are a helpful assistant that recommends assignees for a GitHub task. Only list 5-8 assignees using markdown: "
-            "'1) Assignee Name ((Country Emoji + Country Code only if given) + Phone Number, Email). Reason for choosing: (Explanation)'. "
-            "No prelude, epilogue, or follow-up questions.\n\n"
-            f"Task in need of an assignee:\n\n{task_given}\n"
-            f"Available assignees: {active_members_string}\n\n"
-        )
-        response = await run_assistant(user_prompt)
-        return response + "\n\nLet me know if I should recommend more assignees!"
+        session.members = await get_active_members_from_public_sheet()
+        cache_key = hashlib.blake2b((session.task + session.members).encode(), digest_size=16).hexdigest()
+        cached_response = recommendation_cache.get(cache_key)
+        if cached_response is not None:
+            return add_member_contacts(cached_response) + MORE_ASSIGNEES_PROMPT
+
+        user_prompt = PRIMARY_PROMPT_TEMPLATE.format(task=session.task, members=session.members)
+        response, session.thread_id = await run_assistant(user_prompt)
+        if response not in (ASSISTANT_TIMEOUT_REPLY, ASSISTANT_ERROR_REPLY) and not response.startswith(ASSISTANT_FAILED_REPLY_PREFIX):
+            recommendation_cache[cache_key] = response
+        return add_member_contacts(response) + MORE_ASSIGNEES_PROMPT
     except Exception as e:
         print(f"OpenAI API call failed. Falling back to heuristic. Error: {e}")
-        return await asyncio.get_event_loop().run_in_executor(None, recommend_assignees_fallback_heuristic)
+        return await recommend_assignees_fallback_heuristic()
+
 
+async def recommend_assignees_secondary(session: AssigneeSession, user_message: str) -> str:
+    """Recommend assignees again based on the user's follow-up.
 
-async def recommend_assignees_secondary(past_replies: list[str], task_given: str, user_messages: list[str]) -> str:
+    With an existing thread only the follow-up is sent, since the thread already holds the task,
+    the member list and earlier replies. Without one (the first turn used the cache or the fallback
+    heuristic) a new thread is started with the full context, reusing the session's members list.
+    """
     try:
         if FORCE_FALLBACK_TEST:
             raise openai.APIStatusError(message="Forcing fallback for testing purposes.", response=None, body=None)
 
-        conversation_context = ""
-        for i in range(len(user_messages)):
-            conversation_context += f"User request {i+1}: {user_messages[i]}\n"
-            if i < len(past_replies):
-                conversation_context += f"Bot reply {i+1}: {past_replies[i]}\n"
-        active_members_string = await asyncio.get_event_loop().run_in_executor(None, get_active_members_from_public_sheet)
-        user_prompt = (
-            "You are a helpful assistant recommending assignees for a GitHub task. Consider all previous user requests and your past replies. "
-            "Only list 5-8 assignees using markdown: "
-            "'1) Assignee Name ((Country Emoji + Country Code only if given) + Phone Number, Email). Reason for choosing: (Explanation)'."
-            "No prelude, epilogue, or follow-up questions.\n\n"
-            f"Task in need of an assignee:\n\n{task_given}\n"
-            f"Conversation so far:\n{conversation_context}\n"
-            f"Available assignees: {active_members_string}\n\n"
-        )
-        response = await run_assistant(user_prompt)
-        return response + "\n\nLet me know if I should recommend more assignees!"
+        if session.thread_id is not None:
+            user_prompt = FOLLOW_UP_PROMPT_TEMPLATE.format(request=user_message)
+        else:
+            if session.members is None:
+                session.members = await get_active_members_from_public_sheet()
+            user_prompt = NEW_THREAD_FOLLOW_UP_PROMPT_TEMPLATE.format(task=session.task, request=user_message, members=session.members)
+        response, session.thread_id = await run_assistant(user_prompt, thread_id=session.thread_id)
+        return add_member_contacts(response) + MORE_ASSIGNEES_PROMPT
     except Exception as e:
         print(f"OpenAI API call failed. Falling back to heuristic. Error: {e}")
-        return await asyncio.get_event_loop().run_in_executor(None, recommend_assignees_fallback_heuristic)
+        return await recommend_assignees_fallback_heuristic()
 
 
 # --- Cog Definition ---
 class MantisAssigneeCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.sessions: dict[int, dict[str, Any]] = defaultdict(dict)
-        self.task_given: dict[int, dict[str, Any]] = defaultdict(dict)
-        self.replies: dict[int, list[str]] = defaultdict(list)
-        self.user_messages: dict[int, list[str]] = defaultdict(list)
+        # Sessions expire after an hour so abandoned conversations don't accumulate
+        self.sessions: cachetools.TTLCache[int, AssigneeSession] = cachetools.TTLCache(maxsize=10_000, ttl=3600)
+
+    async def cog_unload(self):
+        global http_session
+        recommendation_cache.clear()
+        if http_session is not None and not http_session.closed:
+            await http_session.close()
+        http_session = None
 
     @commands.Cog.listener('on_message')
     async def on_message_reply(self, message: discord.Message):
         if message.author.bot or not message.reference:
             return
-            
-        user_id = message.author.id
-        
-        if user_id not in self.sessions:
-            return
 
-        session = self.sessions[user_id]
-        
-        if message.reference.message_id != session.get("last_bot_message_id"):
+        session = self.sessions.get(message.author.id)
+        if session is None or message.reference.message_id != session.last_bot_message_id:
             return
 
-        stage = session.get("stage", 0)
-        self.user_messages[user_id].append(message.content)
+        session.user_messages.append(message.content)
 
         async with message.channel.typing():
-            if stage == 0:
-                await message.reply("Here are some people who I think might be a good fit for the task you gave me...", mention_author=False)
-                github_url_pattern = r'https://github\.com/([^/]+)/([^/]+)/issues/(\d+)'
-                match = re.search(github_url_pattern, message.content)
+            await message.reply("Here are some people who I think might be a good fit for the task you gave me...", mention_author=False)
+            if session.stage == 0:
+                match = GITHUB_ISSUE_URL_RE.search(message.content) if "github.com" in message.content else None
                 if match:
                     owner, repo, issue_number = match.groups()
                     issue_path = f"{owner}/{repo}/issues/{issue_number}"
-                    self.task_given[user_id]["task"] = await self.bot.loop.run_in_executor(None, get_issue_info_from_github, issue_path)
-                    reply = await recommend_assignees_primary(self.task_given[user_id]["task"])
+                    session.task = await get_issue_info_from_github(issue_path)
                 else:
-                    self.task_given[user_id]["task"] = message.content
-                    reply = await recommend_assignees_primary(self.task_given[user_id]["task"])
-                
-                self.replies[user_id].append(reply)
-                
-                # Send the reply and store its ID for the next message check
-                sent_message = await message.reply(reply, mention_author=False)
-                session["last_bot_message_id"] = sent_message.id
-                session["stage"] = 1
+                    session.task = message.content
+                reply = await recommend_assignees_primary(session)
+                session.stage = 1
             else:
-                await message.reply("Here are some people who I think might be a good fit for the task you gave me...", mention_author=False)
-                reply = await recommend_assignees_secondary(
-                    self.replies[user_id],
-                    self.task_given[user_id].get("task", ""),
-                    self.user_messages[user_id]
-                )
-                self.replies[user_id].append(reply)
-                
-                # Send the reply and store its ID for the next message check
-                sent_message = await message.reply(reply, mention_author=False)
-                session["last_bot_message_id"] = sent_message.id
+                reply = await recommend_assignees_secondary(session, message.content)
+            session.replies.append(reply)
+
+            # Send the reply and store its ID for the next message check
+            sent_message = await message.reply(reply, mention_author=False)
+            session.last_bot_message_id = sent_message.id
 
     @app_commands.command(name="m4m_find_assignee", description="Find an assignee for your task (via a description or GitHub task)")
     async def m4m_find_assignee_command(self, interaction: discord.Interaction):
-        user_id = interaction.user.id
-        self.sessions[user_id] = {"stage": 0}
+        session = AssigneeSession()
+        self.sessions[interaction.user.id] = session
         
         # Send the initial message and store its ID in the session
         await interaction.response.send_message(
             "Hi, I'll help you find an assignee for your task. Just **hover over this message and click reply** to give me a GitHub URL or description of the task."
         )
         initial_message = await interaction.original_response()
-        self.sessions[user_id]["last_bot_message_id"] = initial_message.id
+        session.last_bot_message_id = initial_message.id
 
 
 # --- Setup Function ---
@@ -1,65 +1,208 @@
 import discord
 from discord.ui import Button, View
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
-from config import GITHUB_ORG_NAME, HEADERS, OPENAI_API_KEY, GITHUB_TOKEN, M4M_MENTOR_LIST, ASSISTANT_ID
+from config import GITHUB_ORG_NAME, GRAPHQL_URL, HEADERS, OPENAI_API_KEY, GITHUB_TOKEN, GITHUB_TOKENS, M4M_MENTOR_LIST, ASSISTANT_ID
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import openai
 import re
 import csv
-from io import StringIO
 import random
 import traceback
 import asyncio
 import time
-from typing import Dict, Any
+import threading
+import itertools
+import hashlib
+import heapq
+from urllib.parse import urlencode
+import cachetools
+from dataclasses import dataclass, field
+from typing import Dict, Any, NamedTuple, Optional, Callable, Awaitable
 
 # Initialize Asynchronous OpenAI client for discord.py
 client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
 
 DISCORD_CHAR_LIMIT = 2000
 
+# Matches a GitHub issue URL and captures (owner, repo, issue number)
+ISSUE_URL_RE = re.compile(r"https://github\.com/([^/]+)/([^/]+)/issues/(\d+)")
+
+# Minimum seconds between Discord edits while a reply streams in; keeps well under the message edit rate limit
+STREAM_EDIT_INTERVAL = 1.0
+
+# Cache for completed assistant replies, keyed by a hash of the assistant ID and the full prompt
+assistant_response_cache = cachetools.TTLCache(maxsize=1024, ttl=3600)
+
+# (connect, read) timeout in seconds for every GitHub and Google Sheets request, so a hung
+# connection fails instead of holding an executor thread and the user's interaction
+HTTP_TIMEOUT = (3, 10)
+
+# Shared HTTP session so GitHub and Google Sheets connections are kept alive between calls.
+# Transient 5xx failures are retried with short, capped backoff (POSTs are not retried). Rate limits
+# aren't retried here: sleeping out a Retry-After would hold an executor thread and the user's
+# interaction, so github_get and github_graphql move to the next pooled token instead.
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=16,
+    max_retries=Retry(total=3, backoff_factor=0.5, backoff_max=4, status_forcelist=[500, 502, 503, 504],
+                      respect_retry_after_header=False, raise_on_status=False),
+))
+
+class GitHubTokenPool:
+    """Hands out the configured GitHub tokens round-robin; shared by executor threads."""
+    def __init__(self, tokens: list):
+        self.size = len(tokens)
+        self._tokens = itertools.cycle(tokens)
+        self._lock = threading.Lock()
+
+    def headers(self) -> dict:
+        with self._lock:
+            token = next(self._tokens)
+        return {**HEADERS, "Authorization": f"Bearer {token}"}
+
+github_token_pool = GitHubTokenPool(GITHUB_TOKENS)
+
+def is_rate_limited(response: requests.Response) -> bool:
+    # Secondary rate limits come back as 429, or as 403 with Retry-After; primary ones as 403 with no remaining calls
+    return response.status_code == 429 or (
+        response.status_code == 403
+        and (response.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in response.headers)
+    )
+
+def github_get(url: str, params: dict = None, headers: dict = None) -> requests.Response:
+    """
+    GETs a read-only GitHub URL with the next pooled token, moving straight on to the
+    next token when one is rate limited (429, or 403 from a spent or secondary limit).
+    headers are added to the token's headers.
+    """
+    for _ in range(github_token_pool.size):
+        response = http_session.get(url, headers={**github_token_pool.headers(), **(headers or {})}, params=params, timeout=HTTP_TIMEOUT)
+        if not is_rate_limited(response):
+            break
+    response.raise_for_status()
+    return response
+
+def github_graphql(query: str, variables: dict) -> dict:
+    """Runs a read-only GraphQL query with the pooled tokens and returns its data."""
+    for _ in range(github_token_pool.size):
+        response = http_session.post(GRAPHQL_URL, headers=github_token_pool.headers(), json={"query": query, "variables": variables}, timeout=HTTP_TIMEOUT)
+        if not is_rate_limited(response):
+            break
+    response.raise_for_status()
+    body = response.json()
+    if body.get("data") is None:
+        raise requests.exceptions.RequestException(f"GitHub GraphQL errors: {body.get('errors')}")
+    return body["data"]
+
+# Cache for the formatted list of unassigned org tasks, keyed by org name. get_org_tasks runs in
+# executor threads and TTLCache isn't thread-safe, so access goes through the lock.
+org_tasks_cache = cachetools.TTLCache(maxsize=4, ttl=90)
+org_tasks_cache_lock = threading.Lock()
+
+# Names of the org's Mantis repos; repos are created rarely, so the listing is kept for an hour
+mantis_repos_cache = cachetools.TTLCache(maxsize=4, ttl=3600)
+
+# (ETag, items, next page URL) from the last full download per list page URL, for conditional
+# requests once mantis_repos_cache expires. Also guarded by org_tasks_cache_lock.
+list_page_validators = cachetools.LRUCache(maxsize=64)
+
+# Cache for the parsed mentor sheet; cleared by /refresh_mentors. Filled from executor threads, so also locked.
+mentors_cache = cachetools.TTLCache(maxsize=1, ttl=600)
+mentors_cache_lock = threading.Lock()
+
+# Selection for one repo's unassigned open issues, newest first; get_org_tasks aliases it once per Mantis repo
+REPO_ISSUES_SELECTION = (
+    "repository(owner: $org, name: $name{i}) {{ "
+    "issues(first: 100, after: $after{i}, states: OPEN, filterBy: {{assignee: null}}, orderBy: {{field: CREATED_AT, direction: DESC}}) {{ "
+    "pageInfo {{ hasNextPage endCursor }} nodes {{ title url }} }} }}"
+)
+
+# Shared in-flight calls by key, so concurrent identical requests make only one call
+inflight_calls: Dict[str, asyncio.Future] = {}
+
+async def single_flight(key: str, make_call: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    Runs make_call() unless a call with the same key is already in flight, in which case
+    its result is awaited instead. The call is shielded so one caller being cancelled
+    doesn't cancel it for the others.
+    """
+    call = inflight_calls.get(key)
+    if call is None:
+        call = asyncio.ensure_future(make_call())
+        inflight_calls[key] = call
+        call.add_done_callback(lambda _: inflight_calls.pop(key, None))
+    return await asyncio.shield(call)
+
 # --- Assistant Runner Helper ---
-async def run_assistant(assistant_id: str, user_message: str, timeout_seconds: int = 90) -> str:
+async def run_assistant(assistant_id: str, user_message: str, timeout_seconds: int = 90,
+                        on_text: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
     """
     Creates a thread, sends a message, runs the assistant using the native openai
-    library, and returns the response.
+    library, and returns the response. Completed replies are cached, so an identical
+    prompt within the hour is answered without a new run.
+
+    The run is streamed; if on_text is given it is awaited with the reply so far as
+    text arrives (at most every STREAM_EDIT_INTERVAL seconds), so callers can show
+    the reply while it is still being generated.
     """
-    try:
-        # Create a new thread for the conversation
-        thread = await client.beta.threads.create()
-
-        # Add the user's message to the thread
-        await client.beta.threads.messages.create(
-            thread_id=thread.id,
-            role="user",
-            content=user_message
-        )
+    cache_key = hashlib.sha256(f"{assistant_id}\n{user_message}".encode()).hexdigest()
+    cached_response = assistant_response_cache.get(cache_key)
+    if cached_response is not None:
+        return cached_response
+    # A caller joining an identical in-flight run gets the final reply without streamed updates
+    return await single_flight(cache_key, lambda: stream_assistant_run(assistant_id, user_message, cache_key, timeout_seconds, on_text))
 
-        # Create a run to process the thread with the assistant
-        run = await client.beta.threads.runs.create(
-            thread_id=thread.id,
-            assistant_id=assistant_id
-        )
+async def stream_assistant_run(assistant_id: str, user_message: str, cache_key: str, timeout_seconds: int,
+                               on_text: Optional[Callable[[str], Awaitable[None]]]) -> str:
+    run_id = None
+    thread_id = None
+    try:
+        # Stream the run so text can be shown as soon as it is generated
+        reply_parts = []
+        run_status = None
+        last_update = 0.0
+        async with asyncio.timeout(timeout_seconds):
+            # Create the thread with the user's message and start the run in one request
+            stream = await client.beta.threads.create_and_run(
+                assistant_id=assistant_id,
+                thread={"messages": [{"role": "user", "content": user_message}]},
+                stream=True
+            )
+            # Close the stream on every exit, including a timeout or an on_text error, so the connection is released
+            async with stream:
+                async for event in stream:
+                    if event.event == "thread.message.delta":
+                        for block in event.data.delta.content or []:
+                            if block.type == "text" and block.text and block.text.value:
+                                reply_parts.append(block.text.value)
+                        if on_text is not None and time.monotonic() - last_update >= STREAM_EDIT_INTERVAL:
+                            last_update = time.monotonic()
+                            await on_text("".join(reply_parts))
+                    elif event.event.startswith("thread.run.") and not event.event.startswith("thread.run.step."):
+                        run_id = event.data.id
+                        thread_id = event.data.thread_id
+                        run_status = event.data.status
 
-        # Poll the run status until it's completed or times out
-        start_time = time.time()
-        while run.status in ["queued", "in_progress"]:
-            if time.time() - start_time > timeout_seconds:
-                return "The assistant took too long to respond. Please try again."
-            await asyncio.sleep(1)  # Wait a second before checking again
-            run = await client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
-
-        # If the run completed successfully, retrieve the assistant's message
-        if run.status == "completed":
-            messages = await client.beta.threads.messages.list(thread_id=thread.id)
-            # The assistant's response is the first message in the list
-            response_content = messages.data[0].content[0].text.value
-            return response_content.strip()
+        # If the run completed successfully, return the assistant's message
+        if run_status == "completed":
+            response_content = "".join(reply_parts).strip()
+            assistant_response_cache[cache_key] = response_content
+            return response_content
         else:
             # Handle other run statuses (e.g., failed, cancelled)
-            return f"The assistant run failed with status: {run.status}"
+            return f"The assistant run failed with status: {run_status}"
 
+    except TimeoutError:
+        if run_id is not None:
+            try:
+                await client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id)
+            except Exception as e:
+                print(f"Failed to cancel timed out assistant run: {e}")
+        return "The assistant took too long to respond. Please try again."
     except Exception as e:
         print(f"An error occurred while running the assistant: {e}")
         traceback.print_exc()
@@ -67,132 +210,341 @@ async def run_assistant(assistant_id: str, user_message: str, timeout_seconds: i
 
 # --- GitHub and Mentor Functions (Now using a Single Assistant) ---
 
+async def fetch_org_tasks() -> str:
+    # Concurrent requests share one executor call while the task cache is cold
+    loop = asyncio.get_running_loop()
+    return await single_flight(f"org_tasks:{GITHUB_ORG_NAME}", lambda: loop.run_in_executor(None, get_org_tasks))
+
+async def fetch_mentor_directory() -> 'MentorDirectory':
+    loop = asyncio.get_running_loop()
+    return await single_flight("mentor_directory", lambda: loop.run_in_executor(None, get_mentors_from_public_sheet))
+
+def get_list_page(page_url: str) -> tuple:
+    """
+    Returns (items, next page URL or None) for one page of a GitHub list endpoint. A page seen
+    before is requested with its ETag, and a 304 reuses the kept page; GitHub doesn't count 304s
+    against the rate limit.
+    """
+    with org_tasks_cache_lock:
+        etag, previous_page = list_page_validators.get(page_url, (None, None))
+    response = github_get(page_url, headers={"If-None-Match": etag} if etag else None)
+    if response.status_code == 304 and previous_page is not None:
+        return previous_page
+    page = (response.json(), response.links.get('next', {}).get('url'))
+    if response.headers.get("ETag"):
+        with org_tasks_cache_lock:
+            list_page_validators[page_url] = (response.headers["ETag"], page)
+    return page
+
+def get_all_pages(url: str, params: dict) -> list:
+    """GET a GitHub list endpoint 100 items at a time, following the Link header's next page."""
+    items = []
+    page_url = f"{url}?{urlencode({**params, 'per_page': 100})}"
+    while page_url:
+        # Next page URLs already carry the query parameters
+        page_items, page_url = get_list_page(page_url)
+        items.extend(page_items)
+    return items
+
+def get_mantis_repo_names() -> list:
+    with org_tasks_cache_lock:
+        cached_names = mantis_repos_cache.get(GITHUB_ORG_NAME)
+    if cached_names is not None:
+        return cached_names
+    repos = get_all_pages(f"https://api.github.com/orgs/{GITHUB_ORG_NAME}/repos", {})
+    repo_names = [repo['name'] for repo in repos if "Mantis" in repo['name']]
+    with org_tasks_cache_lock:
+        mantis_repos_cache[GITHUB_ORG_NAME] = repo_names
+    return repo_names
+
+def get_unassigned_issues(repo_names: list) -> dict:
+    """
+    Returns each repo's unassigned open issues, newest first. Every repo is aliased into one
+    GraphQL query, so all repos are fetched in a single request; repos with more than 100
+    such issues are followed up with their page cursors.
+    """
+    issues_by_repo = {repo_name: [] for repo_name in repo_names}
+    cursors = dict.fromkeys(repo_names)
+    while cursors:
+        pending = list(cursors.items())
+        declarations = "".join(f", $name{i}: String!, $after{i}: String" for i in range(len(pending)))
+        selections = " ".join(f"r{i}: " + REPO_ISSUES_SELECTION.format(i=i) for i in range(len(pending)))
+        variables = {"org": GITHUB_ORG_NAME}
+        for i, (repo_name, cursor) in enumerate(pending):
+            variables[f"name{i}"] = repo_name
+            variables[f"after{i}"] = cursor
+        data = github_graphql(f"query($org: String!{declarations}) {{ {selections} }}", variables)
+        cursors = {}
+        for i, (repo_name, _) in enumerate(pending):
+            # A repo deleted or renamed since the repo listing was cached comes back as null
+            repository = data.get(f"r{i}")
+            if repository is None:
+                continue
+            issues = repository["issues"]
+            issues_by_repo[repo_name].extend(issues["nodes"])
+            if issues["pageInfo"]["hasNextPage"]:
+                cursors[repo_name] = issues["pageInfo"]["endCursor"]
+    return issues_by_repo
+
 def get_org_tasks():
     # This function remains synchronous as it deals with blocking network requests.
+    with org_tasks_cache_lock:
+        cached_tasks = org_tasks_cache.get(GITHUB_ORG_NAME)
+    if cached_tasks is not None:
+        return cached_tasks
+
     all_tasks = []
-    repos_url = f"https://api.github.com/orgs/{GITHUB_ORG_NAME}/repos"
     try:
-        response = requests.get(repos_url, headers=HEADERS)
-        response.raise_for_status()
-        repos = response.json()
-        for repo in repos:
-            repo_name = repo['name']
-            if "Mantis" in repo_name:
-                issues_url = f"https://api.github.com/repos/{GITHUB_ORG_NAME}/{repo_name}/issues"
-                params = {'state': 'open', 'assignee': 'none'}
-                issues_response = requests.get(issues_url, headers=HEADERS, params=params)
-                issues_response.raise_for_status()
-                issues = issues_response.json()
-                if issues:
-                    all_tasks.append(f"--- Tasks from {repo_name} ---")
-                    for issue in issues:
-                        if "pull_request" not in issue:
-                            all_tasks.append(f"- {issue['title']} ({issue['html_url']})")
-                    all_tasks.append("")
+        # GraphQL issues exclude pull requests and return only the fields used here
+        issues_by_repo = get_unassigned_issues(get_mantis_repo_names())
+        for repo_name, issues in issues_by_repo.items():
+            if issues:
+                all_tasks.append(f"--- Tasks from {repo_name} ---")
+                for issue in issues:
+                    all_tasks.append(f"- {issue['title']} ({issue['url']})")
+                all_tasks.append("")
     except requests.exceptions.RequestException as e:
         return f"Error retrieving tasks from GitHub: {str(e)}"
     if not all_tasks:
         return "No open tasks found in any repository."
-    return "\n".join(all_tasks)
+    tasks_text = "\n".join(all_tasks)
+    with org_tasks_cache_lock:
+        org_tasks_cache[GITHUB_ORG_NAME] = tasks_text
+    return tasks_text
 
-async def recommend_tasks_primary(user_interests_text: str) -> str:
+# Fixed instructions for each assistant prompt; only the data after them changes between calls
+TASKS_PRIMARY_INSTRUCTIONS = (
+    "You are a helpful assistant that recommends GitHub tasks. Based on the user's interests, "
+    "recommend relevant tasks from the provided list. Only list 5-8 tasks in the format '1) Task (link)'. "
+    "Do not include any other text.\n\n"
+)
+
+TASKS_SECONDARY_INSTRUCTIONS = (
+    "You are a helpful assistant that recommends GitHub tasks. The user was not satisfied with the previous recommendations. "
+    "Please provide a new set of 5-8 unique tasks from the available tasks. Do not recommend any of the tasks from "
+    "the previous list. Only list the new tasks in the format '1) Task (link)'. Do not include any other text.\n\n"
+)
+
+async def recommend_tasks_primary(user_interests_text: str, on_text: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
     """
     Generates initial task recommendations by sending the original full prompt to the assistant.
+    The instructions and task list come before the user's interests, so the prompt prefix is
+    identical across users while the task cache holds and OpenAI's prompt cache can reuse it.
     """
-    loop = asyncio.get_running_loop()
-    tasks = await loop.run_in_executor(None, get_org_tasks)
+    tasks = await fetch_org_tasks()
     user_prompt = (
-        "You are a helpful assistant that recommends GitHub tasks. Based on the user's interests, "
-        "recommend relevant tasks from the provided list. Only list 5-8 tasks in the format '1) Task (link)'. "
-        "Do not include any other text.\n\n"
-        f"User interests: {user_interests_text}\n\n"
-        f"Available tasks:\n\n{tasks}"
+        TASKS_PRIMARY_INSTRUCTIONS +
+        f"Available tasks:\n\n{tasks}\n\n"
+        f"User interests: {user_interests_text}"
     )
     assistant_id = ASSISTANT_ID
     if not assistant_id:
         return "Error: Assistant ID not configured"
-    return await run_assistant(assistant_id, user_prompt)
+    return await run_assistant(assistant_id, user_prompt, on_text=on_text)
 
-async def recommend_tasks_secondary(existing_tasks_context: str) -> str:
+async def recommend_tasks_secondary(existing_tasks_context: str, on_text: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
     """
     Generates a new set of tasks by sending the original full prompt for secondary recommendations.
     """
-    loop = asyncio.get_running_loop()
-    tasks = await loop.run_in_executor(None, get_org_tasks)
+    tasks = await fetch_org_tasks()
     user_prompt = (
-        "You are a helpful assistant that recommends GitHub tasks. The user was not satisfied with the previous recommendations. "
-        "Please provide a new set of 5-8 unique tasks from the available tasks. Do not recommend any of the tasks from "
-        "the previous list. Only list the new tasks in the format '1) Task (link)'. Do not include any other text.\n\n"
-        f"Previous recommendations:\n{existing_tasks_context}\n\n"
-        f"Available tasks:\n\n{tasks}"
+        TASKS_SECONDARY_INSTRUCTIONS +
+        f"Available tasks:\n\n{tasks}\n\n"
+        f"Previous recommendations:\n{existing_tasks_context}"
     )
     assistant_id = ASSISTANT_ID
     if not assistant_id:
         return "Error: Assistant ID not configured"
-    return await run_assistant(assistant_id, user_prompt)
+    return await run_assistant(assistant_id, user_prompt, on_text=on_text)
+
+def parse_issue_url(issue_url: str) -> Optional[tuple]:
+    """
+    Returns (owner, repo, issue number) for a GitHub issue URL, or None if it isn't one.
+    Plain URLs are split directly; anything else (query strings, extra text) falls back to ISSUE_URL_RE.
+    """
+    stripped_url = issue_url.strip()
+    # Like ISSUE_URL_RE, only https URLs are accepted
+    if stripped_url.startswith("https://"):
+        parts = stripped_url[len("https://"):].split("/")
+        if len(parts) == 5 and parts[0] == "github.com" and parts[3] == "issues" and parts[4].isdigit():
+            return parts[1], parts[2], parts[4]
+    if "github.com/" not in issue_url:
+        return None
+    match = ISSUE_URL_RE.search(issue_url)
+    return match.groups() if match else None
 
-def assign_task_to_user(github_username: str, issue_url: str) -> str:
+def assign_task_to_user(github_username: str, issue_url: str) -> tuple:
+    """
+    Assigns the issue to the user. Returns (message for the user, issue JSON); the issue
+    JSON is the updated issue from GitHub's response on success and None otherwise.
+    """
     github_headers = {
         "Authorization": f"token {GITHUB_TOKEN}",
-        "Accept": "application/vnd.github.v3+json"
+        "Accept": "application/vnd.github+json"
     }
-    match = re.search(r"https://github.com/([^/]+)/([^/]+)/issues/(\d+)", issue_url)
-    if not match:
-        return "Invalid GitHub issue URL provided."
-    owner, repo, issue_number = match.groups()
+    parsed_url = parse_issue_url(issue_url)
+    if not parsed_url:
+        return "Invalid GitHub issue URL provided.", None
+    owner, repo, issue_number = parsed_url
     assignees_url = f"https://api.github.com/repos/{owner}/{repo}/issues/{issue_number}/assignees"
     try:
         payload = {"assignees": [github_username]}
-        response = requests.post(assignees_url, headers=github_headers, json=payload)
+        response = http_session.post(assignees_url, headers=github_headers, json=payload, timeout=HTTP_TIMEOUT)
         response.raise_for_status()
-        return f"Task #{issue_number} in {repo} has been assigned to **{github_username}**. Happy coding! 🧑‍💻"
+        return f"Task #{issue_number} in {repo} has been assigned to **{github_username}**. Happy coding! 🧑‍💻", response.json()
+    except requests.exceptions.Timeout:
+        return "GitHub took too long to respond, so you weren't assigned yet. Please try again in a moment.", None
     except requests.exceptions.RequestException as e:
         status_code = getattr(e.response, 'status_code', 'unknown')
-        return f"Could not assign you to the task. (GitHub returned status {status_code})"
+        return f"Could not assign you to the task. (GitHub returned status {status_code})", None
+
+def format_mentor_line(mentor: dict) -> str:
+    return f"- {mentor['full_name']} (Teams: {mentor['teams']})"
+
+class MentorDirectory(NamedTuple):
+    mentors: list
+    # Mentors keyed by case-folded full name, for matching names in assistant replies
+    by_name: dict
+    # The "Available Mentors" block of the recommendation prompt, built once per sheet fetch
+    mentor_list_text: str
+
+# (mentor key, sheet column, value used when the column is missing)
+MENTOR_SHEET_COLUMNS = (
+    ("full_name", "Full Name", "Unknown"),
+    ("whatsapp", "WhatsApp Mobile number", "N/A"),
+    ("teams", "Teams", "N/A"),
+)
 
-def get_mentors_from_public_sheet():
+def get_mentors_from_public_sheet() -> MentorDirectory:
     # This function remains synchronous
-    response = requests.get(M4M_MENTOR_LIST)
-    response.raise_for_status()
+    with mentors_cache_lock:
+        cached_directory = mentors_cache.get('mentors')
+    if cached_directory is not None:
+        return cached_directory
+
     mentors = []
-    f = StringIO(response.text)
-    reader = csv.DictReader(f)
-    for row in reader:
-        open_status = row.get("Open for Mentees", "").strip().lower()
-        if "no" not in open_status:
-            mentors.append({
-                "full_name": row.get("Full Name", "Unknown"),
-                "whatsapp": row.get("WhatsApp Mobile number", "N/A"),
-                "teams": row.get("Teams", "N/A")
-            })
-    return mentors
+    # Parse rows as the body streams in instead of holding the whole sheet as one string
+    with http_session.get(M4M_MENTOR_LIST, stream=True, timeout=HTTP_TIMEOUT) as response:
+        response.raise_for_status()
+        response.encoding = 'utf-8'
+        # iter_lines drops line endings; restore them so quoted multi-line cells keep their newlines
+        reader = csv.reader(line + "\n" for line in response.iter_lines(decode_unicode=True))
+        header = next(reader, [])
+        # Look the columns up once instead of building a dict per row. A renamed or missing column
+        # falls back to its default for every mentor (and a missing open flag counts as open).
+        fields = [
+            (key, header.index(column) if column in header else None, default)
+            for key, column, default in MENTOR_SHEET_COLUMNS
+        ]
+        i_open = header.index("Open for Mentees") if "Open for Mentees" in header else None
+        for row in reader:
+            if len(row) != len(header) or (i_open is not None and "no" in row[i_open].strip().lower()):
+                continue
+            mentors.append({key: row[i] if i is not None else default for key, i, default in fields})
+    directory = MentorDirectory(
+        mentors,
+        {m['full_name'].casefold(): m for m in mentors},
+        "\n".join(map(format_mentor_line, mentors)),
+    )
+    with mentors_cache_lock:
+        mentors_cache['mentors'] = directory
+    return directory
+
+def parse_mentor_recommendations(response_text: str) -> list:
+    """
+    Extracts (name, reason, message) triples from 'Mentor Name: ...' lines each followed by a
+    'Reason: ...' line, with only blank lines allowed in between. An optional 'Message: ...' after
+    the reason runs until the next mentor and is '' when missing. Scans line by line instead of using a regex.
+    """
+    recommendations = []
+    pending_name = None
+    current = None
+    message_lines = None
+    for line in response_text.splitlines():
+        lowered = line.lower()
+        name_at = lowered.find("mentor name:")
+        if name_at != -1:
+            pending_name = line[name_at + len("mentor name:"):].strip()
+            current = message_lines = None
+        elif pending_name is not None and lowered.lstrip().startswith("reason:"):
+            reason_at = lowered.find("reason:")
+            current = [pending_name, line[reason_at + len("reason:"):].strip(), []]
+            recommendations.append(current)
+            pending_name = None
+        elif current is not None and message_lines is None and lowered.lstrip().startswith("message:"):
+            message_at = lowered.find("message:")
+            message_lines = current[2]
+            message_lines.append(line[message_at + len("message:"):])
+        elif message_lines is not None:
+            message_lines.append(line)
+        elif line.strip():
+            pending_name = None
+    return [(name, reason, "\n".join(lines).strip()) for name, reason, lines in recommendations]
+
+# Past this many open mentors, the prompt lists the best keyword matches plus a few others instead of everyone
+MAX_PROMPT_MENTORS = 30
+PROMPT_MENTOR_FILLERS = 5
+WORD_RE = re.compile(r"\w+")
+# Team names users may write either way
+TEAM_ALIASES = {"m4m": "mantis4mantis", "mantis4mantis": "m4m"}
 
-async def recommend_mentors_via_assistant(mentors: list, user_interests_text: str, assigned_tasks_text: str) -> list:
+def shortlist_mentor_list_text(directory: 'MentorDirectory', user_interests_text: str) -> str:
     """
-    Recommends mentors using the single assistant and parses the response.
+    Returns the "Available Mentors" block for a user. Small sheets are sent whole; larger ones are cut to
+    the MAX_PROMPT_MENTORS mentors whose teams and name share the most words with the user's interests,
+    plus PROMPT_MENTOR_FILLERS others so mentors without keyword matches still get picked. The fillers
+    are seeded by the interests, so the same interests give the same prompt and hit the reply cache.
     """
-    mentor_lookup = {m['full_name'].lower(): m for m in mentors}
-    mentor_list_text = "\n".join([f"- {m['full_name']} (Teams: {m['teams']})" for m in mentors])
+    mentors = directory.mentors
+    if len(mentors) <= MAX_PROMPT_MENTORS + PROMPT_MENTOR_FILLERS:
+        return directory.mentor_list_text
+    interest_words = set(WORD_RE.findall(user_interests_text.casefold()))
+    interest_words.update(TEAM_ALIASES[word] for word in interest_words & TEAM_ALIASES.keys())
+
+    def score(i: int) -> int:
+        mentor = mentors[i]
+        return len(interest_words.intersection(WORD_RE.findall(f"{mentor['teams']} {mentor['full_name']}".casefold())))
+
+    shortlist = set(heapq.nlargest(MAX_PROMPT_MENTORS, range(len(mentors)), key=score))
+    others = [i for i in range(len(mentors)) if i not in shortlist]
+    shortlist.update(random.Random(user_interests_text).sample(others, PROMPT_MENTOR_FILLERS))
+    # Keep the sheet order so the list reads the same as the full one
+    return "\n".join(format_mentor_line(mentors[i]) for i in sorted(shortlist))
+
+MENTOR_RECOMMENDATION_INSTRUCTIONS = (
+    "You are a helpful assistant that recommends mentors for Mantis, a scientific computing platform for analyzing large biomedical datasets. "
+    "Based on the user's interests, assigned task, and team preferences, recommend 3-5 mentors from the provided list. "
+    "For each recommendation, provide the mentor's full name exactly as listed and a detailed explanation of why they are specifically good for this user, "
+    "considering their teams, the user's technical background, and how their skills align with Mantis development needs. "
+    "Also write a WhatsApp message the user could send to that mentor.\n\n"
+    "**Mantis Context**: Mantis involves distributed computing, data analysis pipelines, AI/ML integration, scientific workflows, "
+    "drug discovery algorithms, biomedical data processing, and scalable infrastructure. Match mentors based on these technical areas.\n\n"
+    "**Critical Team Matching Rules**: "
+    "- If user mentions 'Team X' or interest in X area, prioritize mentors who have that team name in their teams list"
+    "- 'Team Integrations' or 'Integrations' → mentors with 'Integrations' in teams"
+    "- 'Team Drugs' or 'Drugs' → mentors with 'Drugs' in teams"
+    "- 'Team Compute' or 'Compute' → mentors with 'Compute' in teams"
+    "- 'Team Science' or 'Science' → mentors with 'Science' in teams"
+    "- 'M4M' or 'Mantis4Mantis' → mentors with 'M4M' or 'Mantis4Mantis' in teams"
+    "- Look for exact team name matches first, then consider related technical skills"
+    "- Always prioritize mentors whose teams directly align with user's stated team interests\n\n"
+    "Use the following format for each recommendation and nothing else:\n"
+    "Mentor Name: [Full Name]\n"
+    "Reason: [Your detailed, specific explanation of why this mentor is perfect for this user's background and goals]\n"
+    "Message: [A friendly, concise WhatsApp message from the user to this mentor that is polite, enthusiastic, and asks for mentorship]\n\n"
+)
+
+async def recommend_mentors_via_assistant(directory: MentorDirectory, user_interests_text: str, assigned_tasks_text: str) -> list:
+    """
+    Recommends mentors using the single assistant and parses the response. The same run drafts
+    each mentor's outreach message, returned as "draft" (None if the reply left it out).
+    """
+    mentors = directory.mentors
+    # The instructions come first and are identical for every user; repeat requests are
+    # answered from the assistant reply cache
     user_prompt = (
-        "You are a helpful assistant that recommends mentors for Mantis, a scientific computing platform for analyzing large biomedical datasets. "
-        "Based on the user's interests, assigned task, and team preferences, recommend 3-5 mentors from the provided list. "
-        "For each recommendation, provide the mentor's full name exactly as listed and a detailed explanation of why they are specifically good for this user, "
-        "considering their teams, the user's technical background, and how their skills align with Mantis development needs.\n\n"
-        "**Mantis Context**: Mantis involves distributed computing, data analysis pipelines, AI/ML integration, scientific workflows, "
-        "drug discovery algorithms, biomedical data processing, and scalable infrastructure. Match mentors based on these technical areas.\n\n"
-        "**Critical Team Matching Rules**: "
-        "- If user mentions 'Team X' or interest in X area, prioritize mentors who have that team name in their teams list"
-        "- 'Team Integrations' or 'Integrations' → mentors with 'Integrations' in teams"
-        "- 'Team Drugs' or 'Drugs' → mentors with 'Drugs' in teams"
-        "- 'Team Compute' or 'Compute' → mentors with 'Compute' in teams"
-        "- 'Team Science' or 'Science' → mentors with 'Science' in teams"
-        "- 'M4M' or 'Mantis4Mantis' → mentors with 'M4M' or 'Mantis4Mantis' in teams"
-        "- Look for exact team name matches first, then consider related technical skills"
-        "- Always prioritize mentors whose teams directly align with user's stated team interests\n\n"
-        "Use the following format for each recommendation and nothing else:\n"
-        "Mentor Name: [Full Name]\n"
-        "Reason: [Your detailed, specific explanation of why this mentor is perfect for this user's background and goals]\n\n"
-        f"Available Mentors:\n{mentor_list_text}\n\n"
+        MENTOR_RECOMMENDATION_INSTRUCTIONS +
+        f"Available Mentors:\n{shortlist_mentor_list_text(directory, user_interests_text)}\n\n"
         f"User Interests (contains team preferences and skills):\n{user_interests_text}\n\n"
         f"Assigned Task:\n{assigned_tasks_text}"
     )
@@ -201,16 +553,15 @@ async def recommend_mentors_via_assistant(mentors: list, user_interests_text: st
         return []
     response_text = await run_assistant(assistant_id, user_prompt)
     recommendations = []
-    pattern = re.compile(r"Mentor Name:\s*(.*?)\s*\nReason:\s*(.*)", re.IGNORECASE)
-    matches = pattern.findall(response_text)
-    for name, reason in matches:
-        mentor_data = mentor_lookup.get(name.strip().lower())
+    for name, reason, draft in parse_mentor_recommendations(response_text):
+        mentor_data = directory.by_name.get(name.strip().casefold())
         if mentor_data:
             recommendations.append({
                 "full_name": mentor_data['full_name'],
                 "whatsapp": mentor_data['whatsapp'],
                 "teams": mentor_data['teams'],
-                "reason": reason.strip()
+                "reason": reason.strip(),
+                "draft": draft or None
             })
 
     if not recommendations: # Fallback to random mentors
@@ -219,16 +570,32 @@ async def recommend_mentors_via_assistant(mentors: list, user_interests_text: st
     return recommendations
 
 
+SKILLS_EXPLANATION_INSTRUCTIONS = (
+    "You are explaining how a user's background relates to contributing to Mantis, a scientific computing platform for analyzing large biomedical datasets. "
+    "Based on their skills and projects (NOT their team preferences), write a brief 1-2 sentence explanation of how their technical background applies to Mantis development. "
+    "Focus only on connecting their programming skills, AI/ML experience, or technical projects to Mantis areas like distributed computing, data analysis pipelines, "
+    "AI/ML integration, scientific workflows, drug discovery algorithms, biomedical data processing, and scalable infrastructure. "
+    "Do not mention teams or future contributions - only focus on their existing technical skills. Use simple, conversational language without bullets or bold formatting.\n\n"
+)
+
+MENTOR_FOLLOWUP_INSTRUCTIONS = (
+    "You are helping a user understand mentor recommendations for contributing to Mantis, a scientific computing platform. "
+    "The user has a follow-up question about the mentors that were recommended to them. Answer their question helpfully and conversationally. "
+    "If they ask for more mentors, explain that you've already shown the best matches but can suggest looking at the full Google Sheet. "
+    "If they ask why someone was picked, give a detailed explanation. Be concise but informative.\n\n"
+)
+
+OUTREACH_DRAFT_INSTRUCTIONS = (
+    "Write a friendly, concise WhatsApp message that a user could send to the mentor named below. "
+    "The message should be polite, enthusiastic, and ask for mentorship.\n\n"
+)
+
 async def explain_skills_relation_to_mantis(user_interests_text: str) -> str:
     """
     Generates a personalized explanation of how the user's skills relate to Mantis.
     """
     user_prompt = (
-        "You are explaining how a user's background relates to contributing to Mantis, a scientific computing platform for analyzing large biomedical datasets. "
-        "Based on their skills and projects (NOT their team preferences), write a brief 1-2 sentence explanation of how their technical background applies to Mantis development. "
-        "Focus only on connecting their programming skills, AI/ML experience, or technical projects to Mantis areas like distributed computing, data analysis pipelines, "
-        "AI/ML integration, scientific workflows, drug discovery algorithms, biomedical data processing, and scalable infrastructure. "
-        "Do not mention teams or future contributions - only focus on their existing technical skills. Use simple, conversational language without bullets or bold formatting.\n\n"
+        SKILLS_EXPLANATION_INSTRUCTIONS +
         f"User background and interests:\n{user_interests_text}"
     )
     assistant_id = ASSISTANT_ID
@@ -236,16 +603,14 @@ async def explain_skills_relation_to_mantis(user_interests_text: str) -> str:
         return "• **Your background** → Valuable contributions to Mantis development"
     return await run_assistant(assistant_id, user_prompt)
 
-async def handle_mentor_followup_question(user_question: str, user_interests: str, recommended_mentors: list, assigned_task: str = "") -> str:
+async def handle_mentor_followup_question(user_question: str, user_interests: str, recommended_mentors: list, assigned_task: str = "",
+                                         on_text: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
     """
     Handles follow-up questions about mentor recommendations using the LLM.
     """
     mentor_list_text = "\n".join([f"- {m['full_name']} (Teams: {m['teams']}) - {m['reason']}" for m in recommended_mentors])
     user_prompt = (
-        "You are helping a user understand mentor recommendations for contributing to Mantis, a scientific computing platform. "
-        "The user has a follow-up question about the mentors that were recommended to them. Answer their question helpfully and conversationally. "
-        "If they ask for more mentors, explain that you've already shown the best matches but can suggest looking at the full Google Sheet. "
-        "If they ask why someone was picked, give a detailed explanation. Be concise but informative.\n\n"
+        MENTOR_FOLLOWUP_INSTRUCTIONS +
         f"User's original interests: {user_interests}\n\n"
         f"Assigned task: {assigned_task or 'General mentorship'}\n\n"
         f"Recommended mentors:\n{mentor_list_text}\n\n"
@@ -254,17 +619,17 @@ async def handle_mentor_followup_question(user_question: str, user_interests: st
     assistant_id = ASSISTANT_ID
     if not assistant_id:
         return "I'd be happy to help, but I'm having trouble accessing my knowledge base right now. Please try again later."
-    return await run_assistant(assistant_id, user_prompt)
+    return await run_assistant(assistant_id, user_prompt, on_text=on_text)
 
 async def draft_outreach_message(user_interests_text: str, assigned_tasks_text: str, mentor_name: str) -> str:
     """
     Drafts a WhatsApp outreach message by sending the original prompt to the assistant.
     """
     user_prompt = (
-        f"Write a friendly, concise WhatsApp message that a user could send to a mentor named {mentor_name}. "
+        OUTREACH_DRAFT_INSTRUCTIONS +
+        f"Mentor: {mentor_name}\n\n"
         f"The user is interested in these areas:\n{user_interests_text}\n\n"
-        f"The user plans to work on these tasks:\n{assigned_tasks_text}\n\n"
-        "The message should be polite, enthusiastic, and ask for mentorship."
+        f"The user plans to work on these tasks:\n{assigned_tasks_text}"
     )
     assistant_id = ASSISTANT_ID
     if not assistant_id:
@@ -274,112 +639,230 @@ async def draft_outreach_message(user_interests_text: str, assigned_tasks_text:
 
 ### --- Cog and Discord Views ---
 
+async def cancel_and_wait(*futures: Optional[asyncio.Future]):
+    """
+    Cancels any of futures still running and waits for all of them, retrieving their results
+    or exceptions so none is left running or unretrieved. None entries are skipped.
+    """
+    pending = [future for future in futures if future is not None]
+    for future in pending:
+        future.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+def split_for_discord(text: str, limit: int = DISCORD_CHAR_LIMIT, separators: tuple = ("\n\n", "\n")) -> list:
+    """
+    Splits text into chunks of at most limit characters, breaking between paragraphs where
+    possible, then between lines, and cutting mid-line only when a single line is too long.
+    """
+    if len(text) <= limit:
+        return [text]
+    if not separators:
+        return [text[i:i + limit] for i in range(0, len(text), limit)]
+    separator = separators[0]
+    chunks = []
+    current = ""
+    for piece in text.split(separator):
+        candidate = f"{current}{separator}{piece}" if current else piece
+        if len(candidate) <= limit:
+            current = candidate
+            continue
+        if current:
+            chunks.append(current)
+        *full_chunks, current = split_for_discord(piece, limit, separators[1:])
+        chunks.extend(full_chunks)
+    if current:
+        chunks.append(current)
+    return chunks
+
+async def finish_in_chunks(message: discord.Message, content: str, view: Optional[View] = None) -> discord.Message:
+    """
+    Edits message to the first chunk of content and sends the remaining chunks after it, with
+    the view on the last one. Returns the message holding the end of the content.
+    """
+    first_chunk, *later_chunks = split_for_discord(content)
+    if not later_chunks:
+        await message.edit(content=first_chunk, view=view)
+        return message
+    await message.edit(content=first_chunk)
+    for i, chunk in enumerate(later_chunks, 1):
+        message = await message.channel.send(chunk, view=view if i == len(later_chunks) else None)
+    return message
+
+
+@dataclass(slots=True)
+class UserSession:
+    """Conversation state for one user's /m4m or /m4m_mentor session."""
+    # 0 and 1 for the task steps of /m4m, then a named stage per step after that
+    stage: Any = 0
+    last_bot_message_id: Optional[int] = None
+    user_interests: str = ""
+    issue_context: str = ""
+    github_username: Optional[str] = None
+    assigned_task: str = ""
+    recommended_mentors: list = field(default_factory=list)
+
+
+class SessionView(View):
+    """
+    A view belonging to one user's session. Only that user can press its buttons, and when it
+    times out its buttons are disabled on the message stored in self.message.
+    """
+    def __init__(self, cog: 'MantisCog', user_id: int, *, timeout: float):
+        super().__init__(timeout=timeout)
+        self.cog = cog
+        self.user_id = user_id
+        self.message: Optional[discord.Message] = None
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id == self.user_id:
+            return True
+        await interaction.response.send_message("These buttons belong to someone else's session. Use `/m4m` to start your own!", ephemeral=True)
+        return False
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+class M4MView(SessionView):
+    def __init__(self, cog: 'MantisCog', user_id: int, *, timeout=180):
+        super().__init__(cog, user_id, timeout=timeout)
+
+    async def on_timeout(self):
+        await super().on_timeout()
+        # These buttons are the only way forward from this step, so a session still waiting on them is over
+        session = self.cog.sessions.get(self.user_id)
+        if session is not None and self.message is not None and session.last_bot_message_id == self.message.id:
+            self.cog.sessions.pop(self.user_id, None)
+
+    @discord.ui.button(label="Find more tasks", style=discord.ButtonStyle.primary)
+    async def find_more_button(self, interaction: discord.Interaction, button: Button):
+        for item in self.children:
+            item.disabled = True
+        await interaction.response.edit_message(view=self)
+        self.stop()
+        
+        session = self.cog.sessions.get(self.user_id) or UserSession()
+        last_msg_id = session.last_bot_message_id
+        if last_msg_id:
+            last_msg = interaction.channel.get_partial_message(last_msg_id)
+            status_message = await last_msg.reply("Searching for more tasks...", mention_author=False)
+        else:
+            status_message = await interaction.followup.send("Searching for more tasks...", wait=True)
+        intro = "Here are some more tasks you might like:\n\n"
+
+        # Stream the new tasks into the status message, then finish it in place with the buttons
+        async def show_partial_tasks(partial_tasks: str):
+            try:
+                await status_message.edit(content=f"{intro}{partial_tasks}"[:DISCORD_CHAR_LIMIT])
+            except discord.HTTPException:
+                pass
+
+        async with interaction.channel.typing():
+            existing_context = session.issue_context
+            new_tasks = await recommend_tasks_secondary(existing_context, on_text=show_partial_tasks)
+            session.issue_context = existing_context + "\n\n" + new_tasks
+
+        final_content = f"{intro}{new_tasks}\n\nWhat would you like to do next?"
+        view = M4MView(self.cog, self.user_id)
+        last_message = await finish_in_chunks(status_message, final_content, view)
+        view.message = last_message
+
+        session.last_bot_message_id = last_message.id
+        self.cog.sessions[self.user_id] = session
+        
+    @discord.ui.button(label="I have a task, assign me", style=discord.ButtonStyle.success)
+    async def assign_task_button(self, interaction: discord.Interaction, button: Button):
+        for item in self.children:
+            item.disabled = True
+        await interaction.response.edit_message(view=self)
+        self.stop()
+        session = self.cog.sessions.get(self.user_id) or UserSession()
+        auto_github_username = None
+        try:
+            mapping = await self.cog.bot.member_cache.get_mapping()
+            user = interaction.user
+            candidate_names = {user.name, user.global_name, user.display_name}
+            if user.discriminator != "0":
+                candidate_names.add(f"{user.name}#{user.discriminator}")
+            lower_candidates = {str(c).lower() for c in candidate_names if c}
+            for gh_username, info in mapping.items():
+                if isinstance(info, dict) and info.get("discord_username", "").lower() in lower_candidates:
+                    auto_github_username = gh_username
+                    break
+        except Exception:
+            auto_github_username = None
+
+        if auto_github_username:
+            session.github_username = auto_github_username
+            session.stage = "awaiting_issue_url"
+            sent_message = await interaction.followup.send(
+                f"I found your GitHub username from the member mapping: **@{auto_github_username}**.\n"
+                "Please reply with the full **GitHub issue URL** you'd like to be assigned to.",
+            )
+        else:
+            session.stage = "awaiting_github_username"
+            sent_message = await interaction.followup.send(
+                "Great! Please reply to this message with your **GitHub username**.",
+            )
+        
+        session.last_bot_message_id = sent_message.id
+        self.cog.sessions[self.user_id] = session
+
+class MentorButton(Button):
+    def __init__(self, cog: 'MantisCog', mentor_name: str, whatsapp_number: str, user_id: int, user_interests_text: str, assigned_tasks_text: str, draft: str = None):
+        label = mentor_name if mentor_name and mentor_name.strip() else "View Mentor"
+        super().__init__(label=label[:80], style=discord.ButtonStyle.secondary)
+        self.cog = cog
+        self.mentor_name = mentor_name
+        self.whatsapp_number = whatsapp_number
+        self.user_id = user_id
+        self.user_interests_text = user_interests_text
+        self.assigned_tasks_text = assigned_tasks_text
+        self.draft = draft
+
+    async def callback(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        draft = self.draft or await draft_outreach_message(self.user_interests_text, self.assigned_tasks_text, self.mentor_name)
+        await interaction.followup.send(f"Here is a WhatsApp message you can send to **{self.mentor_name}** ({self.whatsapp_number}):\n\n> {draft}", ephemeral=True)
+
+class MentorSelectionView(SessionView):
+    # On timeout only the buttons are disabled; the session stays open for follow-up questions
+    def __init__(self, cog: 'MantisCog', user_id: int, mentors: list, user_interests_text: str, assigned_tasks_text: str, *, timeout=300):
+        super().__init__(cog, user_id, timeout=timeout)
+        for mentor in mentors:
+            self.add_item(MentorButton(
+                cog,
+                mentor.get('full_name'),
+                mentor.get('whatsapp', "N/A"),
+                user_id,
+                user_interests_text,
+                assigned_tasks_text,
+                mentor.get('draft')
+            ))
+
+
 class MantisCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.sessions: Dict[int, Dict[str, Any]] = {}
-
-    class M4MView(View):
-        def __init__(self, cog: 'MantisCog', user_id: int, *, timeout=180):
-            super().__init__(timeout=timeout)
-            self.cog = cog
-            self.user_id = user_id
-
-        @discord.ui.button(label="Find more tasks", style=discord.ButtonStyle.primary)
-        async def find_more_button(self, interaction: discord.Interaction, button: Button):
-            for item in self.children:
-                item.disabled = True
-            await interaction.response.edit_message(view=self)
-            
-            session = self.cog.sessions.get(self.user_id, {})
-            last_msg_id = session.get("last_bot_message_id")
-            if last_msg_id:
-                last_msg = interaction.channel.get_partial_message(last_msg_id)
-                await last_msg.reply("Searching for more tasks...", mention_author=False)
-            else:
-                await interaction.followup.send("Searching for more tasks...", ephemeral=True)
-
-
-            async with interaction.channel.typing():
-                existing_context = session.get("issue_context", "")
-                new_tasks = await recommend_tasks_secondary(existing_context)
-                session["issue_context"] = existing_context + "\n\n" + new_tasks
-                self.cog.sessions[self.user_id] = session
-
-            final_message = ("Here are some more tasks you might like:\n\n" + new_tasks)[:DISCORD_CHAR_LIMIT]
-            sent_message = await interaction.followup.send(final_message)
-            
-            session["last_bot_message_id"] = sent_message.id
-            self.cog.sessions[self.user_id] = session
-
-            new_view = self.cog.M4MView(self.cog, self.user_id)
-            await sent_message.edit(content=f"{sent_message.content}\n\nWhat would you like to do next?", view=new_view)
-            
-        @discord.ui.button(label="I have a task, assign me", style=discord.ButtonStyle.success)
-        async def assign_task_button(self, interaction: discord.Interaction, button: Button):
-            for item in self.children:
-                item.disabled = True
-            await interaction.response.edit_message(view=self)
-            session = self.cog.sessions.get(self.user_id, {})
-            auto_github_username = None
-            try:
-                mapping = await self.cog.bot.member_cache.get_mapping()
-                user = interaction.user
-                candidate_names = {user.name, user.global_name, user.display_name}
-                if user.discriminator != "0":
-                    candidate_names.add(f"{user.name}#{user.discriminator}")
-                lower_candidates = {str(c).lower() for c in candidate_names if c}
-                for gh_username, info in mapping.items():
-                    if isinstance(info, dict) and info.get("discord_username", "").lower() in lower_candidates:
-                        auto_github_username = gh_username
-                        break
-            except Exception:
-                auto_github_username = None
-
-            if auto_github_username:
-                session["github_username"] = auto_github_username
-                session["stage"] = "awaiting_issue_url"
-                sent_message = await interaction.followup.send(
-                    f"I found your GitHub username from the member mapping: **@{auto_github_username}**.\n"
-                    "Please reply with the full **GitHub issue URL** you'd like to be assigned to.",
-                )
-            else:
-                session["stage"] = "awaiting_github_username"
-                sent_message = await interaction.followup.send(
-                    "Great! Please reply to this message with your **GitHub username**.",
-                )
-            
-            session["last_bot_message_id"] = sent_message.id
-            self.cog.sessions[self.user_id] = session
-
-    class MentorButton(Button):
-        def __init__(self, cog: 'MantisCog', mentor_name: str, whatsapp_number: str, user_id: int, user_interests_text: str, assigned_tasks_text: str):
-            label = mentor_name if mentor_name and mentor_name.strip() else "View Mentor"
-            super().__init__(label=label[:80], style=discord.ButtonStyle.secondary)
-            self.cog = cog
-            self.mentor_name = mentor_name
-            self.whatsapp_number = whatsapp_number
-            self.user_id = user_id
-            self.user_interests_text = user_interests_text
-            self.assigned_tasks_text = assigned_tasks_text
-
-        async def callback(self, interaction: discord.Interaction):
-            await interaction.response.defer(ephemeral=True, thinking=True)
-            draft = await draft_outreach_message(self.user_interests_text, self.assigned_tasks_text, self.mentor_name)
-            await interaction.followup.send(f"Here is a WhatsApp message you can send to **{self.mentor_name}** ({self.whatsapp_number}):\n\n> {draft}", ephemeral=True)
-
-    class MentorSelectionView(View):
-        def __init__(self, cog: 'MantisCog', user_id: int, mentors: list, user_interests_text: str, assigned_tasks_text: str, *, timeout=300):
-            super().__init__(timeout=timeout)
-            for mentor in mentors:
-                self.add_item(cog.MentorButton(
-                    cog,
-                    mentor.get('full_name'),
-                    mentor.get('whatsapp', "N/A"),
-                    user_id,
-                    user_interests_text,
-                    assigned_tasks_text
-                ))
+        # Sessions expire 30 minutes after they were last stored, so abandoned conversations don't
+        # accumulate; the handlers write the session back after every step, which renews it
+        self.sessions: cachetools.TTLCache[int, UserSession] = cachetools.TTLCache(maxsize=10_000, ttl=1800)
+
+    async def cog_load(self):
+        self.expire_sessions.start()
+
+    async def cog_unload(self):
+        self.expire_sessions.cancel()
+
+    @tasks.loop(minutes=5)
+    async def expire_sessions(self):
+        # TTLCache only drops expired entries when it is written to, so a quiet bot would keep them until then
+        self.sessions.expire()
 
     @commands.Cog.listener('on_message')
     async def on_message_reply(self, message: discord.Message):
@@ -392,26 +875,28 @@ class MantisCog(commands.Cog):
             return
 
         # Crucial check: only process the reply if it is to the last message the bot sent for this session.
-        if message.reference.message_id != session.get("last_bot_message_id"):
+        if message.reference.message_id != session.last_bot_message_id:
             return
 
-        stage = session.get("stage")
+        stage = session.stage
         try:
             if stage == "mentor_interests":
                 interests = message.content.strip()
-                session["user_interests"] = interests
+                session.user_interests = interests
                 sent_message = await message.reply("Thanks! Let me find mentors who match your interests and skills...", mention_author=False)
-                session["last_bot_message_id"] = sent_message.id
+                session.last_bot_message_id = sent_message.id
 
                 async with message.channel.typing():
-                    loop = asyncio.get_running_loop()
-                    mentors = await loop.run_in_executor(None, get_mentors_from_public_sheet)
+                    mentor_directory = await fetch_mentor_directory()
                     # For mentor-only mode, we don't have an assigned task, so we'll use a generic message
                     assigned_task_placeholder = "Looking for mentorship to get started with Mantis contributions"
-                    recommended_mentors = await recommend_mentors_via_assistant(mentors, interests, assigned_task_placeholder)
+                    # The skills explanation doesn't depend on the mentors, so it runs alongside the recommendation
+                    recommended_mentors, skills_explanation = await asyncio.gather(
+                        recommend_mentors_via_assistant(mentor_directory, interests, assigned_task_placeholder),
+                        explain_skills_relation_to_mantis(interests)
+                    )
 
                     # Send context message first
-                    skills_explanation = await explain_skills_relation_to_mantis(interests)
                     context_message = f"## How Your Skills Relate to Mantis\n{skills_explanation}"
                     await message.channel.send(context_message)
                     
@@ -427,129 +912,139 @@ class MantisCog(commands.Cog):
                     
                     mentor_message += "\nIf you want to see other mentors who are open to taking on new mentees, check out this [Google Sheet](https://docs.google.com/spreadsheets/d/128HP4RuiJdRqe9Ukd9HboEgBq6GuA37N2vdy2ej07ok/edit?usp=sharing) for the entire list.\n\n**Questions?** Reply to follow-up.\n"
 
-                    view = self.MentorSelectionView(self, user_id, recommended_mentors, interests, assigned_task_placeholder)
+                    view = MentorSelectionView(self, user_id, recommended_mentors, interests, assigned_task_placeholder)
                     sent_message = await message.channel.send(mentor_message[:DISCORD_CHAR_LIMIT], view=view)
-                    session["last_bot_message_id"] = sent_message.id
+                    view.message = sent_message
+                    session.last_bot_message_id = sent_message.id
                     
                     # Set up follow-up stage
-                    session["stage"] = "mentor_followup"
-                    session["recommended_mentors"] = recommended_mentors
-                    session["user_interests"] = interests
-                    session["assigned_task"] = assigned_task_placeholder
+                    session.stage = "mentor_followup"
+                    session.recommended_mentors = recommended_mentors
+                    session.user_interests = interests
+                    session.assigned_task = assigned_task_placeholder
                     self.sessions[user_id] = session
 
             elif stage == 0:
                 interests = message.content.strip()
-                session["user_interests"] = interests
+                session.user_interests = interests
                 sent_message = await message.reply("Thanks! Finding some suitable tasks based on your interests...", mention_author=False)
-                session["last_bot_message_id"] = sent_message.id
+                session.last_bot_message_id = sent_message.id
+                intro = "Based on what you told me, I think you'll like these tasks:\n\n"
+
+                # Show the recommendations in the reply as they stream in
+                async def show_partial_tasks(partial_tasks: str):
+                    try:
+                        await sent_message.edit(content=f"{intro}{partial_tasks}"[:DISCORD_CHAR_LIMIT])
+                    except discord.HTTPException:
+                        pass
 
                 async with message.channel.typing():
-                    recommended_tasks = await recommend_tasks_primary(interests)
-                session["issue_context"] = recommended_tasks
-                intro = "Based on what you told me, I think you'll like these tasks:\n\n"
+                    recommended_tasks = await recommend_tasks_primary(interests, on_text=show_partial_tasks)
+                session.issue_context = recommended_tasks
                 
-                # Send the final response with buttons in one message
+                # Finish the same message with the full response and buttons, continuing in new messages if it's too long
                 final_content = f"{intro}{recommended_tasks}\n\nWhat would you like to do next?"
-                button_message = await message.channel.send(
-                    final_content[:DISCORD_CHAR_LIMIT],
-                    view=self.M4MView(self, user_id)
-                )
-                session["last_bot_message_id"] = button_message.id
-                session["stage"] = 1
+                view = M4MView(self, user_id)
+                last_message = await finish_in_chunks(sent_message, final_content, view)
+                view.message = last_message
+                session.last_bot_message_id = last_message.id
+                session.stage = 1
                 self.sessions[user_id] = session
 
             elif stage == "awaiting_github_username":
-                session["github_username"] = message.content.strip()
-                session["stage"] = "awaiting_issue_url"
+                session.github_username = message.content.strip()
+                session.stage = "awaiting_issue_url"
                 
                 sent_message = await message.reply("Got it! Now, please reply with the full **GitHub issue URL** you'd like to be assigned to.", mention_author=False)
-                session["last_bot_message_id"] = sent_message.id
+                session.last_bot_message_id = sent_message.id
                 self.sessions[user_id] = session
 
             elif stage == "awaiting_issue_url":
-                github_username = session.get("github_username")
+                github_username = session.github_username
                 if not github_username:
                     sent_message = await message.reply("I don't have your GitHub username yet. Please send it first.", mention_author=False)
-                    session["last_bot_message_id"] = sent_message.id
-                    session["stage"] = "awaiting_github_username"
+                    session.last_bot_message_id = sent_message.id
+                    session.stage = "awaiting_github_username"
                     self.sessions[user_id] = session
                     return
 
                 issue_url = message.content.strip()
                 # sent_message = await message.reply("Perfect. Let me try to assign that to you now...", mention_author=False)
-                # session["last_bot_message_id"] = sent_message.id
+                # session.last_bot_message_id = sent_message.id
                 
-                async with message.channel.typing():
-                    assign_response = assign_task_to_user(github_username, issue_url)
+                # The mentor sheet is needed as soon as the assignment succeeds and is usually cached,
+                # so load it while GitHub handles the assignment
+                mentor_directory_task = asyncio.create_task(fetch_mentor_directory())
+                mentors_and_skills = None
+                try:
+                    async with message.channel.typing():
+                        # Blocking HTTP; run it off the event loop so other handlers aren't stalled
+                        loop = asyncio.get_running_loop()
+                        assign_response, issue_json = await loop.run_in_executor(None, assign_task_to_user, github_username, issue_url)
                 
-                # Update the last message ID to the assign response
-                sent_message = await message.channel.send(assign_response)
-                session["last_bot_message_id"] = sent_message.id
+                    # Update the last message ID to the assign response
+                    sent_message = await message.channel.send(assign_response)
+                    session.last_bot_message_id = sent_message.id
 
-                if "has been assigned" in assign_response:
-                    try:
-                        match = re.search(r"https://github.com/([^/]+)/([^/]+)/issues/(\d+)", issue_url)
-                        if match:
-                            owner, repo, issue_num = match.groups()
-                            issue_api_url = f"https://api.github.com/repos/{owner}/{repo}/issues/{issue_num}"
-                            res = requests.get(issue_api_url, headers=HEADERS)
-                            res.raise_for_status()
-                            title = res.json().get("title", "Unnamed Task")
-                            session["assigned_task"] = f"{title} ({issue_url})"
-                        else:
-                            session["assigned_task"] = issue_url
-                    except Exception:
-                        session["assigned_task"] = issue_url
+                    if issue_json:
+                        # The assignment response is the updated issue, so the title needs no extra request
+                        session.assigned_task = f"{issue_json.get('title', 'Unnamed Task')} ({issue_url})"
+                        interests = session.user_interests
+                        tasks = session.assigned_task
 
-                    sent_message = await message.channel.send("Now that you have a task, let's find you a mentor! Searching...")
-                    session["last_bot_message_id"] = sent_message.id
+                        async def recommend_mentors() -> list:
+                            return await recommend_mentors_via_assistant(await mentor_directory_task, interests, tasks)
 
-                    async with message.channel.typing():
-                        interests = session.get("user_interests", "")
-                        tasks = session.get("assigned_task", "")
-                        loop = asyncio.get_running_loop()
-                        mentors = await loop.run_in_executor(None, get_mentors_from_public_sheet)
-                        recommended_mentors = await recommend_mentors_via_assistant(mentors, interests, tasks)
+                        # Start both runs before posting the status message; the skills explanation doesn't depend on the mentors
+                        mentors_and_skills = asyncio.gather(recommend_mentors(), explain_skills_relation_to_mantis(interests))
+
+                        sent_message = await message.channel.send("Now that you have a task, let's find you a mentor! Searching...")
+                        session.last_bot_message_id = sent_message.id
 
-                        # Send context message first
-                        skills_explanation = await explain_skills_relation_to_mantis(interests)
-                        context_message = f"## How Your Skills Relate to Mantis\n{skills_explanation}"
-                        await message.channel.send(context_message)
+                        async with message.channel.typing():
+                            recommended_mentors, skills_explanation = await mentors_and_skills
+
+                            # Send context message first
+                            context_message = f"## How Your Skills Relate to Mantis\n{skills_explanation}"
+                            await message.channel.send(context_message)
                         
-                        # Build mentor message with length checking
-                        mentor_message = "## Recommended Mentors\nHere are mentors who can help you contribute effectively:\n"
-                        for mentor in recommended_mentors:
-                            mentor_entry = f"\n**{mentor['full_name']}** (Teams: {mentor['teams']})\n*{mentor['reason']}*\n"
-                            if len(mentor_message + mentor_entry) > 1800:  # Leave room for footer
-                                await message.channel.send(mentor_message)
-                                mentor_message = mentor_entry
-                            else:
-                                mentor_message += mentor_entry
+                            # Build mentor message with length checking
+                            mentor_message = "## Recommended Mentors\nHere are mentors who can help you contribute effectively:\n"
+                            for mentor in recommended_mentors:
+                                mentor_entry = f"\n**{mentor['full_name']}** (Teams: {mentor['teams']})\n*{mentor['reason']}*\n"
+                                if len(mentor_message + mentor_entry) > 1800:  # Leave room for footer
+                                    await message.channel.send(mentor_message)
+                                    mentor_message = mentor_entry
+                                else:
+                                    mentor_message += mentor_entry
                         
-                        mentor_message += "\nIf you want to see other mentors who are open to taking on new mentees, check out this [Google Sheet](https://docs.google.com/spreadsheets/d/128HP4RuiJdRqe9Ukd9HboEgBq6GuA37N2vdy2ej07ok/edit?usp=sharing) for the entire list.\n\n**Questions?** Reply to ask me why I picked someone specific, request different mentors, or ask anything else about these recommendations!"
+                            mentor_message += "\nIf you want to see other mentors who are open to taking on new mentees, check out this [Google Sheet](https://docs.google.com/spreadsheets/d/128HP4RuiJdRqe9Ukd9HboEgBq6GuA37N2vdy2ej07ok/edit?usp=sharing) for the entire list.\n\n**Questions?** Reply to ask me why I picked someone specific, request different mentors, or ask anything else about these recommendations!"
 
-                        view = self.MentorSelectionView(self, user_id, recommended_mentors, interests, tasks)
-                        sent_message = await message.channel.send(mentor_message[:DISCORD_CHAR_LIMIT], view=view)
-                        session["last_bot_message_id"] = sent_message.id
+                            view = MentorSelectionView(self, user_id, recommended_mentors, interests, tasks)
+                            sent_message = await message.channel.send(mentor_message[:DISCORD_CHAR_LIMIT], view=view)
+                            view.message = sent_message
+                            session.last_bot_message_id = sent_message.id
                         
-                        # Set up follow-up stage
-                        session["stage"] = "mentor_followup"
-                        session["recommended_mentors"] = recommended_mentors
-                        session["user_interests"] = interests
-                        session["assigned_task"] = tasks
-                        self.sessions[user_id] = session
-                else:
-                    sent_message = await message.channel.send("Since the assignment didn't succeed, mentor recommendations are unavailable. You can try assigning another task!")
-                    session["last_bot_message_id"] = sent_message.id
+                            # Set up follow-up stage
+                            session.stage = "mentor_followup"
+                            session.recommended_mentors = recommended_mentors
+                            session.user_interests = interests
+                            session.assigned_task = tasks
+                            self.sessions[user_id] = session
+                    else:
+                        sent_message = await message.channel.send("Since the assignment didn't succeed, mentor recommendations are unavailable. You can try assigning another task!")
+                        session.last_bot_message_id = sent_message.id
+                finally:
+                    # Settle the background work on every exit path, including a failed assignment or Discord error
+                    await cancel_and_wait(mentor_directory_task, mentors_and_skills)
 
                 # Don't remove session - keep it for potential follow-ups
                 
             elif stage == "mentor_followup":
                 user_question = message.content.strip()
-                interests = session.get("user_interests", "")
-                recommended_mentors = session.get("recommended_mentors", [])
-                assigned_task = session.get("assigned_task", "")
+                interests = session.user_interests
+                recommended_mentors = session.recommended_mentors
+                assigned_task = session.assigned_task
                 
                 # Check if user wants to exit or is done
                 if any(word in user_question.lower() for word in ["thanks", "thank you", "done", "that's all", "no more"]):
@@ -558,14 +1053,21 @@ class MantisCog(commands.Cog):
                     return
                 
                 sent_message = await message.reply("Let me think about that...", mention_author=False)
-                session["last_bot_message_id"] = sent_message.id
-                
+                session.last_bot_message_id = sent_message.id
+
+                # Show the answer in the reply as it streams in
+                async def show_partial_answer(partial_answer: str):
+                    try:
+                        await sent_message.edit(content=partial_answer[:DISCORD_CHAR_LIMIT])
+                    except discord.HTTPException:
+                        pass
+
                 async with message.channel.typing():
-                    response = await handle_mentor_followup_question(user_question, interests, recommended_mentors, assigned_task)
+                    response = await handle_mentor_followup_question(user_question, interests, recommended_mentors, assigned_task, on_text=show_partial_answer)
                 
                 follow_up_message = f"{response}\n\n*Feel free to ask more questions about the mentors, or say 'thanks' when you're ready to reach out to them!*"
-                sent_message = await message.channel.send(follow_up_message[:DISCORD_CHAR_LIMIT])
-                session["last_bot_message_id"] = sent_message.id
+                last_message = await finish_in_chunks(sent_message, follow_up_message)
+                session.last_bot_message_id = last_message.id
                 self.sessions[user_id] = session
 
         except Exception:
@@ -576,7 +1078,7 @@ class MantisCog(commands.Cog):
     @app_commands.command(name="m4m", description="Find a task and mentor to contribute to Mantis.")
     async def m4m_task_mentor_agent(self, interaction: discord.Interaction):
         user_id = interaction.user.id
-        self.sessions[user_id] = {"stage": 0, "last_bot_message_id": None}
+        self.sessions[user_id] = UserSession(stage=0)
         
         await interaction.response.send_message(
             "Hi! I'll help you find a task and mentor to begin contributing to Mantis\n\n"
@@ -586,12 +1088,12 @@ class MantisCog(commands.Cog):
             "This helps me recommend tasks that match your technical background and mentors who can guide your contributions!"
         )
         initial_message = await interaction.original_response()
-        self.sessions[user_id]["last_bot_message_id"] = initial_message.id
+        self.sessions[user_id].last_bot_message_id = initial_message.id
 
     @app_commands.command(name="m4m_mentor", description="Find a mentor based on your skills and interests.")
     async def m4m_mentor_only(self, interaction: discord.Interaction):
         user_id = interaction.user.id
-        self.sessions[user_id] = {"stage": "mentor_interests", "last_bot_message_id": None}
+        self.sessions[user_id] = UserSession(stage="mentor_interests")
         
         await interaction.response.send_message(
             "Hi! I'll help you find a mentor to guide you in contributing to Mantis\n\n"
@@ -602,7 +1104,14 @@ class MantisCog(commands.Cog):
             "Your background will help me match you with mentors who can guide you in contributing to Mantis's scientific workflows and infrastructure!"
         )
         initial_message = await interaction.original_response()
-        self.sessions[user_id]["last_bot_message_id"] = initial_message.id
+        self.sessions[user_id].last_bot_message_id = initial_message.id
+
+    @app_commands.command(name="refresh_mentors", description="Reload the mentor list from the Google Sheet.")
+    @app_commands.default_permissions(administrator=True)
+    async def refresh_mentors(self, interaction: discord.Interaction):
+        with mentors_cache_lock:
+            mentors_cache.clear()
+        await interaction.response.send_message("The mentor list will be reloaded from the Google Sheet on its next use.", ephemeral=True)
 
 
 ### --- Setup Function ---
@@ -27,6 +27,9 @@ HEADERS = {
     "Content-Type": "application/json",
     "Accept": "application/json",
 }
+GITHUB_HTTP_TIMEOUT = 15  # Total timeout in seconds for async GitHub requests
+# Optional comma-separated extra tokens; read-only GitHub calls rotate through them to spread rate limits
+GITHUB_TOKENS = [token.strip() for token in os.getenv("GITHUB_TOKENS", "").split(",") if token.strip()] or [GITHUB_TOKEN]
 
 # ─── GitHub Organization ─────────────────────────────────────────────────────
 GITHUB_ORG_NAME = "KellisLab"
@@ -35,6 +38,10 @@ GITHUB_ORG_NAME = "KellisLab"
 ITEMS_PER_PAGE = 100  # Max allowed by GitHub for project items
 PROJECTS_PER_PAGE = 20
 
+# ─── Cache Settings ─────────────────────────────────────────────────────────
+PROJECTS_CACHE_DURATION = 300  # Cache rendered /projects embed for 5 minutes (in seconds)
+ISSUE_PR_CACHE_DURATION = 30  # Cache /issues and /prs GraphQL responses for 30 seconds
+
 # ─── Project Field Configuration ─────────────────────────────────────────────
 STATUS_FIELD_NAME = "Status"
 UNASSIGNED_STATUS_NAME = "No Status / Other"
@@ -43,6 +50,10 @@ DEFAULT_STATUS = "Todo"
 # ─── Display Limits ─────────────────────────────────────────────────────────
 MAX_ITEMS_TO_DISPLAY = 50
 DISCORD_FIELD_CHAR_LIMIT = 1020  # Safety margin below Discord's 1024 limit
+EMBED_SIZE_LIMIT = 5500  # Safety margin below Discord's 6000 char embed limit
+MAX_EMBED_FIELDS = 25  # Discord's per-embed field limit
+MAX_EMBEDS_PER_MESSAGE = 10  # Discord's per-message embed limit
+MESSAGE_EMBED_CHAR_LIMIT = 6000  # Combined char limit across all embeds in one message
 
 # ─── Reminder System Configuration ──────────────────────────────────────────
 REMINDER_CHANNEL_ID = 1398706671089352744  # Channel to send reminders to